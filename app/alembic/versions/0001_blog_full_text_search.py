@@ -0,0 +1,34 @@
+"""blog full-text search
+
+Revision ID: 0001_blog_full_text_search
+Revises:
+Create Date: 2026-10-18 14:51:48
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_blog_full_text_search'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Tables are created complete by Base.metadata.create_all at startup, so
+# existing databases may already have these and every step is idempotent
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("blog_posts"):
+        return
+    op.execute("ALTER TABLE blog_posts ADD COLUMN IF NOT EXISTS language VARCHAR(10) NOT NULL DEFAULT 'en'")
+    op.execute("ALTER TABLE blog_posts ADD COLUMN IF NOT EXISTS search_vector TSVECTOR")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_blog_posts_search_vector ON blog_posts USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_blog_posts_search_vector")
+    op.execute("ALTER TABLE blog_posts DROP COLUMN IF EXISTS search_vector")
+    op.execute("ALTER TABLE blog_posts DROP COLUMN IF EXISTS language")
@@ -0,0 +1,30 @@
+"""blog keyset pagination indexes
+
+Revision ID: 0002_blog_keyset_indexes
+Revises: 0001_blog_full_text_search
+Create Date: 2026-10-18 14:58:12
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_blog_keyset_indexes'
+down_revision: Union[str, None] = '0001_blog_full_text_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("blog_posts"):
+        return
+    op.execute("CREATE INDEX IF NOT EXISTS ix_blog_posts_published_created_at_id ON blog_posts (published, created_at, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_blog_posts_created_at_id ON blog_posts (created_at, id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_blog_posts_created_at_id")
+    op.execute("DROP INDEX IF EXISTS ix_blog_posts_published_created_at_id")
@@ -0,0 +1,36 @@
+"""blog tag counts
+
+Revision ID: 0003_blog_tag_counts
+Revises: 0002_blog_keyset_indexes
+Create Date: 2026-10-18 15:04:37
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_blog_tag_counts'
+down_revision: Union[str, None] = '0002_blog_keyset_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("blog_tag_counts"):
+        return
+    op.create_table(
+        'blog_tag_counts',
+        sa.Column('tag', sa.String(), nullable=False),
+        sa.Column('post_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('tag')
+    )
+    op.create_index(op.f('ix_blog_tag_counts_post_count'), 'blog_tag_counts', ['post_count'], unique=False)
+    # Run python -m app.jobs.reindex_blog afterwards to fill the table
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_blog_tag_counts_post_count'), table_name='blog_tag_counts')
+    op.drop_table('blog_tag_counts')
@@ -0,0 +1,33 @@
+"""tier and product updated_at
+
+Revision ID: 0004_tier_product_updated_at
+Revises: 0003_blog_tag_counts
+Create Date: 2026-10-18 15:12:09
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_tier_product_updated_at'
+down_revision: Union[str, None] = '0003_blog_tag_counts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ("tiers", "products")
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        if inspector.has_table(table):
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS updated_at")
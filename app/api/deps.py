@@ -1,31 +1,57 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from typing import AsyncGenerator
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, ReadSessionLocal
 from app.core.auth import get_current_user_from_token, security
+from app.core.principals import UserPrincipal, get_cached_principal, cache_principal
 from app.models.user import User
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_db() -> Generator:
-    db = SessionLocal()
-    try:
+# Clients that just wrote can send this header, or carry this cookie, to read from the primary
+READ_PRIMARY_HEADER = "X-Read-Primary"
+READ_PRIMARY_COOKIE = "read_primary"
+
+def reads_pinned_to_primary(request: Request) -> bool:
+    return bool(request.headers.get(READ_PRIMARY_HEADER) or request.cookies.get(READ_PRIMARY_COOKIE))
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only endpoints, served by the replica unless reads are pinned"""
+    session_factory = AsyncSessionLocal if reads_pinned_to_primary(request) else ReadSessionLocal
+    async with session_factory() as db:
         yield db
-    finally:
-        db.close()
+
+def pin_reads_to_primary(response: Response):
+    """Route this client's reads to the primary for a short read-your-writes window"""
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        "1",
+        max_age=settings.DB_READ_PIN_SECONDS,
+        httponly=True,
+        samesite="lax"
+    )
 
 async def get_current_user(
-    token_data: dict = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db)
-) -> User:
+    token_data: dict = Depends(get_current_user_from_token)
+) -> UserPrincipal:
     """Get current user from token"""
-    user = db.query(User).filter(User.clerk_id == token_data.get("sub")).first()
+    clerk_id = token_data.get("sub")
+    principal = get_cached_principal(clerk_id)
+    if principal:
+        return principal
+
+    # Only open a session on a cache miss
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.clerk_id == clerk_id))
+        user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return cache_principal(user)
 
-async def admin_required(current_user: User = Depends(get_current_user)):
+async def admin_required(current_user: UserPrincipal = Depends(get_current_user)):
     """Check if current user is admin"""
     logger.info(f"Current user: {current_user.email} role {current_user.role}")
     if current_user.role != "admin":
@@ -2,6 +2,12 @@ from fastapi import APIRouter
 from typing import Dict
 import psutil
 import time
+from app.core.cache import get_cache_stats
+from app.core.invalidation import invalidation_bus
+from app.core.rate_limit import openai_limiter
+from app.services.openai_service import markdown_ttft
+from app.db.session import engine, async_engine, read_async_engine
+from app.db.pool_metrics import get_pool_stats
 
 router = APIRouter()
 
@@ -29,4 +35,33 @@ async def liveness():
 async def readiness():
     """Kubernetes readiness probe"""
     # Add your readiness checks here (e.g., database connection)
-    return {"status": "ready"} 
\ No newline at end of file
+    return {"status": "ready"}
+
+@router.get("/health/caches")
+async def cache_stats():
+    """Hit/miss counters of the in-process caches"""
+    return get_cache_stats()
+
+@router.get("/health/openai")
+async def openai_stats():
+    """Per-model queue wait, upstream latency and retry counters of OpenAI calls"""
+    return {
+        "models": openai_limiter.stats(),
+        "markdown_ttft_seconds": markdown_ttft.snapshot()
+    }
+
+@router.get("/health/invalidation")
+async def invalidation_stats():
+    """Cache invalidation bus backend and message counters"""
+    return invalidation_bus.stats()
+
+@router.get("/health/db")
+async def database_pool_stats():
+    """Live connection pool statistics, used to size DB_POOL_* settings"""
+    stats = {
+        "async": get_pool_stats(async_engine.pool),
+        "sync": get_pool_stats(engine.pool)
+    }
+    if read_async_engine is not async_engine:
+        stats["async_read"] = get_pool_stats(read_async_engine.pool)
+    return stats
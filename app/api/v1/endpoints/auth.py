@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 import logging
-from sqlalchemy.orm import Session
 from typing import Dict
 from app.api.deps import get_current_user
+from app.core.principals import invalidate_principal
 from app.db.session import get_db
 from app.services import user_service
 from app.schemas.user import User, UserCreate, UserUpdate
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from app.models.user_subscription import UserSubscription
 from datetime import datetime, timedelta
 
@@ -17,7 +18,7 @@ router = APIRouter()
 @router.post("/sync")
 async def sync_user(
     data: Dict = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Sync user data from Clerk with our database.
@@ -43,6 +44,8 @@ async def sync_user(
             user_update = UserUpdate(**user_data)
             db_user = await user_service.update_user(db, db_user, user_update)
 
+        invalidate_principal(clerk_id)
+
         return {
             "status": "success",
             "user": {
@@ -64,9 +67,10 @@ async def register_free_tier(
 ):
     try:
         # Check if user already has a subscription
-        existing_subscription = await db.query(UserSubscription).filter(
-            UserSubscription.user_id == current_user.id
-        ).first()
+        result = await db.execute(
+            select(UserSubscription).where(UserSubscription.user_id == current_user.id)
+        )
+        existing_subscription = result.scalars().first()
 
         if existing_subscription:
             if existing_subscription.tier_id == 'free':
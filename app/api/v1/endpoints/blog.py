@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
-from app.schemas.blog import BlogPost, BlogPostCreate, BlogPostUpdate
+from app.schemas.blog import BlogPost, BlogPostSummary, BlogPostCreate, BlogPostUpdate
 from app.schemas.common import PaginatedResponse
 from app.models.user import User
-from app.services import blog_service
-from app.api.deps import get_current_user, admin_required
+from app.services import blog_service, markdown_service
+from app.core.http_cache import make_etag, is_not_modified, not_modified_response, set_validators
+from app.api.deps import get_current_user, admin_required, get_read_db, pin_reads_to_primary
 from typing import List, Optional
 import logging
 
@@ -13,7 +14,7 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/", response_model=PaginatedResponse[BlogPost])
+@router.get("/", response_model=PaginatedResponse[BlogPostSummary])
 async def list_blog_posts(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
@@ -21,8 +22,32 @@ async def list_blog_posts(
     search: Optional[str] = None,
     author_id: Optional[int] = None,
     published: Optional[bool] = Query(None, description="Filter by published status (True for published, False for unpublished, None for both)"),
-    db: Session = Depends(get_db)
+    locale: Optional[str] = Query(None, description="Search language, defaults to the site locale"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor; pass an empty value for the first page"),
+    total: Optional[str] = Query(None, pattern="^(exact|estimate|none)$", description="How to compute the total: exact count, planner estimate, or skip it. Defaults to exact for offset pages and none for cursor pages"),
+    db: AsyncSession = Depends(get_read_db)
 ):
+    filters = dict(tag=tag, search=search, author_id=author_id, published=published, locale=locale)
+    if total is None:
+        # Cursor clients page forward without a total, so don't count every page
+        total = "none" if cursor is not None else "exact"
+    if total == "exact":
+        total_count = await blog_service.get_posts_count(db, **filters)
+    elif total == "estimate":
+        total_count = await blog_service.estimate_posts_count(db, **filters)
+    else:
+        total_count = None
+    
+    if cursor is not None:
+        posts, next_cursor = await blog_service.get_blog_posts_page(db, cursor=cursor, limit=limit, **filters)
+        return PaginatedResponse(
+            items=posts,
+            total=total_count,
+            skip=0,
+            limit=limit,
+            next_cursor=next_cursor
+        )
+    
     posts = await blog_service.get_blog_posts(
         db, 
         skip=skip, 
@@ -30,18 +55,18 @@ async def list_blog_posts(
         tag=tag,
         search=search,
         author_id=author_id,
-        published=published
+        published=published,
+        locale=locale
     )
-    total = await blog_service.get_posts_count(db, tag, search, author_id, published)
     return PaginatedResponse(
         items=posts,
-        total=total,
+        total=total_count,
         skip=skip,
         limit=limit
     )
 
-@router.get("/menu", response_model=List[BlogPost])
-async def get_menu_posts(db: Session = Depends(get_db)):
+@router.get("/menu", response_model=List[BlogPostSummary])
+async def get_menu_posts(db: AsyncSession = Depends(get_read_db)):
     """Get all published blog posts that are marked to appear in the menu"""
     logger.info("Getting menu posts")
     posts = await blog_service.get_menu_posts(db)
@@ -51,7 +76,7 @@ async def get_menu_posts(db: Session = Depends(get_db)):
 @router.get("/tags", response_model=List[str])
 async def get_popular_tags(
     limit: Optional[int] = Query(None, ge=1, le=50, description="Maximum number of tags to return"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
         logger.info(f"Getting popular tags with limit: {limit}")
@@ -67,26 +92,43 @@ async def get_popular_tags(
             detail="Failed to retrieve popular tags"
         )
 
-@router.post("/", response_model=BlogPost, dependencies=[Depends(admin_required)])
-async def create_blog_post(post: BlogPostCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.post("/", response_model=BlogPost, dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def create_blog_post(post: BlogPostCreate, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     return await blog_service.create_blog_post(db, post, current_user.id)
 
 @router.get("/{slug}", response_model=BlogPost)
-async def get_blog_post(slug: str, db: Session = Depends(get_db)):
+async def get_blog_post(
+    slug: str,
+    request: Request,
+    response: Response,
+    render: Optional[str] = Query(None, pattern="^html$", description="Also return the body as sanitised HTML with a table of contents"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    version = await blog_service.get_post_version(db, slug)
+    if not version:
+        raise HTTPException(status_code=404, detail="Blog post not found")
+    post_id, updated_at = version
+    etag = make_etag("blog", post_id, updated_at.isoformat(), render)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+    
     db_post = await blog_service.get_blog_post_by_slug(db, slug)
     if not db_post:
         raise HTTPException(status_code=404, detail="Blog post not found")
+    if render:
+        db_post.rendered = await markdown_service.get_rendered_post(db_post)
+    set_validators(response, etag, updated_at)
     return db_post
 
-@router.put("/{post_id}", response_model=BlogPost, dependencies=[Depends(admin_required)])
-async def update_blog_post(post_id: int, post: BlogPostUpdate, db: Session = Depends(get_db)):
+@router.put("/{post_id}", response_model=BlogPost, dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def update_blog_post(post_id: int, post: BlogPostUpdate, db: AsyncSession = Depends(get_db)):
     db_post = await blog_service.get_blog_post(db, post_id)
     if not db_post:
         raise HTTPException(status_code=404, detail="Blog post not found")
     return await blog_service.update_blog_post(db, db_post, post)
 
-@router.delete("/{post_id}", dependencies=[Depends(admin_required)])
-async def delete_blog_post(post_id: int, db: Session = Depends(get_db)):
+@router.delete("/{post_id}", dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def delete_blog_post(post_id: int, db: AsyncSession = Depends(get_db)):
     db_post = await blog_service.get_blog_post(db, post_id)
     if not db_post:
         raise HTTPException(status_code=404, detail="Blog post not found")
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, Body, Path, HTTPException
+from fastapi import APIRouter, Depends, Body, Path, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from app.api.deps import admin_required
-from app.services import content_service, openai_service
+from app.services import content_service, openai_service, translation_service, media_service, media_library_service
+from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 from typing import Optional
 from app.core.config import settings
-from app.schemas.content import HomeContent
+from app.schemas.content import HomeContent, TranslationBatchRequest, TranslationJobStatus
+from app.celery_app import celery_app
+from app.jobs.translate_content import translate_content_batch
+from celery.result import AsyncResult
+from app.core.http_cache import make_etag, is_not_modified, not_modified_response, set_validators
+from contextlib import aclosing
+from datetime import datetime, timezone
 import aiohttp
-import os
-from uuid import uuid4
+import asyncio
+import json
+import time
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -42,9 +52,18 @@ async def update_terms(
 
 @router.get("/home/{locale}")
 async def get_home_content(
+    request: Request,
+    response: Response,
     locale: str = Path(..., description="Language locale code")
 ):
     """Get home page content for specified locale"""
+    stat = await content_service.get_content_stat("home", locale)
+    if stat is not None:
+        etag = make_etag("home", locale, stat.st_mtime_ns, stat.st_size)
+        last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        set_validators(response, etag, last_modified)
     content = await content_service.read_content("home", locale)
     logger.info(f"Home content for locale {locale}: {content}")
     return content
@@ -66,7 +85,8 @@ async def translate_content(
     content_type: str,
     source_locale: str,
     target_locale: str,
-    force: bool = Body(False)
+    force: bool = Body(False),
+    db: AsyncSession = Depends(get_db)
 ):
     """Translate content from source locale to target locale"""
     # Check if target content already exists
@@ -83,16 +103,42 @@ async def translate_content(
         raise HTTPException(status_code=404, detail="Source content not found")
     
     # Translate content
-    translated_content = await openai_service.translate_content(source_content, target_locale)
+    translated_content = await translation_service.translate_content(db, source_content, target_locale)
     
     # Save translated content
     await content_service.write_content(content_type, translated_content, target_locale)
     return {"status": "success", "translated_content": translated_content}
 
+@router.post("/translate-batch", response_model=TranslationJobStatus, status_code=202, dependencies=[Depends(admin_required)])
+async def start_translation_batch(batch: TranslationBatchRequest):
+    """Queue translation of several content types into several locales"""
+    invalid = set(batch.content_types) - settings.ALLOWED_CONTENT_TYPES
+    if invalid or not batch.content_types or not batch.target_locales:
+        raise HTTPException(status_code=400, detail="Invalid content types or locales")
+    
+    task = translate_content_batch.delay(
+        batch.content_types,
+        batch.source_locale,
+        batch.target_locales,
+        batch.force
+    )
+    logger.info(f"Queued translation batch {task.id}")
+    return TranslationJobStatus(task_id=task.id, state="PENDING")
+
+@router.get("/translate-batch/{task_id}", response_model=TranslationJobStatus, dependencies=[Depends(admin_required)])
+async def get_translation_batch(task_id: str):
+    """Progress, then the per content type and locale outcome, of a translation batch"""
+    result = AsyncResult(task_id, app=celery_app)
+    if result.failed():
+        return TranslationJobStatus(task_id=task_id, state=result.state, error=str(result.result))
+    progress = result.result if isinstance(result.result, dict) else None
+    return TranslationJobStatus(task_id=task_id, state=result.state, progress=progress)
+
 @router.post("/generate-image", dependencies=[Depends(admin_required)])
 async def generate_image(
     prompt: str = Body(...),
-    save_to_media: bool = Body(True)
+    save_to_media: bool = Body(True),
+    db: AsyncSession = Depends(get_db)
 ):
     """Generate an image from a prompt using DALL-E"""
     # Generate image URL using DALL-E
@@ -107,23 +153,18 @@ async def generate_image(
             if response.status != 200:
                 raise HTTPException(status_code=500, detail="Failed to download generated image")
             
-            # Create unique filename
-            file_extension = "png"
-            filename = f"generated_{uuid4()}.{file_extension}"
-            filepath = os.path.join(settings.UPLOAD_DIR, "images", filename)
-            
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            
-            # Save the image
-            with open(filepath, "wb") as f:
-                f.write(await response.read())
+            # Save the image under its content hash, a regenerated identical image is stored once
+            received = await media_service.write_temp_file(await response.read())
+            media, _, derivatives = await media_library_service.store_file(
+                db, "image", "images", "png", "image/png", received
+            )
             
             # Return both the original URL and the saved path
             return {
                 "original_url": image_url,
-                "saved_path": f"/uploads/images/{filename}",
-                "url": f"{settings.SERVER_HOST}/uploads/images/{filename}"
+                "saved_path": f"/uploads/{media.path}",
+                "url": media_library_service.media_url(media),
+                "derivatives": derivatives
             }
 
 @router.post("/generate-markdown", dependencies=[Depends(admin_required)])
@@ -144,3 +185,43 @@ async def generate_markdown(
             status_code=500,
             detail="Failed to generate markdown content"
         )
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/generate-markdown/stream", dependencies=[Depends(admin_required)])
+async def stream_markdown(
+    request: Request,
+    prompt: str = Body(...),
+    locale: str = Body(settings.DEFAULT_LOCALE)
+):
+    """Stream generated markdown as Server-Sent Events: ttft, token..., then done or error"""
+    async def events():
+        start = time.perf_counter()
+        tokens = 0
+        try:
+            # aclosing closes the upstream stream as soon as we stop, not when the generator is collected
+            async with aclosing(openai_service.stream_markdown_content(prompt, locale)) as stream:
+                async for token in stream:
+                    if await request.is_disconnected():
+                        logger.info(f"Client disconnected after {tokens} markdown tokens, stopping generation")
+                        return
+                    if tokens == 0:
+                        ttft = time.perf_counter() - start
+                        openai_service.markdown_ttft.observe(ttft)
+                        yield _sse_event("ttft", {"ttft_ms": round(ttft * 1000)})
+                    tokens += 1
+                    yield _sse_event("token", {"content": token})
+            yield _sse_event("done", {"tokens": tokens, "duration_ms": round((time.perf_counter() - start) * 1000)})
+        except asyncio.CancelledError:
+            logger.info(f"Markdown stream cancelled after {tokens} tokens")
+            raise
+        except Exception as e:
+            logger.error(f"Failed to stream markdown content: {str(e)}")
+            yield _sse_event("error", {"detail": "Failed to generate markdown content"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
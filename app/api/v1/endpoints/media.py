@@ -1,105 +1,252 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from typing import List
-import aiofiles
-import os
+from fastapi import APIRouter, HTTPException, Depends, Request, Header, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-import uuid
+from typing import List, Optional
 from app.core.config import settings
 from app.api.deps import admin_required
+from app.db.session import get_db
+from app.schemas.common import PaginatedResponse
+from app.core.storage import storage
+from app.schemas.media import (
+    ResumableUploadCreate,
+    ResumableUploadStatus,
+    MediaFileResponse,
+    DirectUploadCreate,
+    DirectUpload,
+    DirectUploadComplete
+)
+from app.services import media_service, media_library_service
+from app.services.media_service import get_file_extension
 
 router = APIRouter()
 
-def get_file_extension(filename: str) -> str:
-    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-
 def is_allowed_file(filename: str, file_type: str) -> bool:
     extension = get_file_extension(filename)
     return extension in settings.ALLOWED_EXTENSIONS.get(file_type, set())
 
-async def check_file_size(file: UploadFile, file_type: str) -> None:
-    max_size = settings.MAX_FILE_SIZE.get(file_type)
-    if not max_size:
-        raise HTTPException(status_code=400, detail=f"Invalid file type: {file_type}")
-    
-    # Read first chunk to get content length
-    chunk = await file.read(max_size + 1)
-    file_size = len(chunk)
-    
-    # Reset file position for later reading
-    await file.seek(0)
+def check_upload_type(file_type: str, filename: str) -> None:
+    if file_type not in settings.ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Invalid file type")
     
-    if file_size > max_size:
-        readable_size = f"{max_size / 1_000_000:.1f}MB"
+    if not is_allowed_file(filename, file_type):
         raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size for {file_type} is {readable_size}"
+            status_code=400, 
+            detail=f"File type not allowed. Allowed extensions: {settings.ALLOWED_EXTENSIONS[file_type]}"
         )
 
-@router.post("/upload/{file_type}", dependencies=[Depends(admin_required)])
+def upload_response(media, content_type: Optional[str], deduplicated: bool, derivatives: Optional[dict]) -> dict:
+    response = {
+        "url": media_library_service.media_url(media),
+        "filename": media.filename,
+        "content_type": content_type,
+        "size": media.size,
+        "sha256": media.sha256,
+        "id": media.id,
+        "deduplicated": deduplicated
+    }
+    if media.file_type == "image":
+        response["derivatives"] = derivatives
+    return response
+
+async def store_received_file(
+    db: AsyncSession,
+    file_type: str,
+    extension: str,
+    content_type: Optional[str],
+    received: media_service.StoredFile
+) -> dict:
+    media, deduplicated, derivatives = await media_library_service.store_file(
+        db, file_type, file_type, extension, content_type, received
+    )
+    return upload_response(media, content_type, deduplicated, derivatives)
+
+# The body is parsed by media_service.MultipartUpload, so it is documented here
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+@router.post("/upload/{file_type}", dependencies=[Depends(admin_required)], openapi_extra=UPLOAD_REQUEST_BODY)
 async def upload_file(
     file_type: str,
-    file: UploadFile = File(...),
+    request: Request,
+    content_sha256: Optional[str] = Header(
+        None,
+        alias="X-Content-SHA256",
+        description="SHA-256 of the file; if it is already stored the file content is not read"
+    ),
+    db: AsyncSession = Depends(get_db)
 ):
     if file_type not in settings.ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Invalid file type")
     
-    if not is_allowed_file(file.filename, file_type):
-        raise HTTPException(
-            status_code=400, 
-            detail=f"File type not allowed. Allowed extensions: {settings.ALLOWED_EXTENSIONS[file_type]}"
-        )
+    # Reject oversized bodies early, the exact limit is enforced while streaming
+    media_service.check_content_length(request.headers.get("content-length"), file_type)
     
-    # Check file size
-    await check_file_size(file, file_type)
-
-    # Create upload directory if it doesn't exist
-    upload_path = os.path.join(settings.UPLOAD_DIR, file_type)
-    os.makedirs(upload_path, exist_ok=True)
-
-    # Generate unique filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    unique_id = str(uuid.uuid4())[:8]
-    extension = get_file_extension(file.filename)
-    new_filename = f"{timestamp}_{unique_id}.{extension}"
-    file_path = os.path.join(upload_path, new_filename)
+    upload = media_service.MultipartUpload(request)
+    filename = await upload.read_headers()
+    check_upload_type(file_type, filename)
+    
+    if content_sha256 and media_service.SHA256_RE.match(content_sha256):
+        existing = await media_library_service.reference_existing(db, file_type, content_sha256)
+        if existing:
+            media, derivatives = existing
+            return upload_response(media, upload.content_type, True, derivatives)
 
     try:
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
-        
-        return {
-            "url": f"{settings.SERVER_HOST}/uploads/{file_type}/{new_filename}",
-            "filename": new_filename,
-            "content_type": file.content_type
-        }
+        received = await media_service.receive_upload(upload, file_type)
+    except HTTPException:
+        raise
     except Exception as e:
-        # Clean up file if it was created
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return await store_received_file(db, file_type, get_file_extension(filename), upload.content_type, received)
+
+@router.post("/resumable", response_model=ResumableUploadStatus, status_code=201, dependencies=[Depends(admin_required)])
+async def create_resumable_upload(upload: ResumableUploadCreate, db: AsyncSession = Depends(get_db)):
+    """Start a resumable upload, then PUT chunks at increasing offsets and complete it"""
+    check_upload_type(upload.file_type, upload.filename)
+    session = await media_service.create_resumable_upload(
+        db,
+        upload.file_type,
+        upload.filename,
+        upload.size,
+        upload.sha256,
+        upload.content_type
+    )
+    return ResumableUploadStatus(
+        upload_id=session.upload_id,
+        offset=0,
+        size=session.size,
+        chunk_size=settings.RESUMABLE_UPLOAD_CHUNK_SIZE
+    )
+
+@router.get("/resumable/{upload_id}", response_model=ResumableUploadStatus, dependencies=[Depends(admin_required)])
+async def get_resumable_upload(upload_id: str, db: AsyncSession = Depends(get_db)):
+    """Current offset, where the client should resume"""
+    session = await media_service.get_resumable_upload(db, upload_id)
+    return ResumableUploadStatus(
+        upload_id=upload_id,
+        offset=session.received,
+        size=session.size,
+        chunk_size=settings.RESUMABLE_UPLOAD_CHUNK_SIZE
+    )
+
+@router.put("/resumable/{upload_id}", response_model=ResumableUploadStatus, dependencies=[Depends(admin_required)])
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., ge=0, description="Byte offset of this chunk, must equal the current offset"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Store the raw request body as the chunk at Upload-Offset; a partially received chunk is dropped"""
+    session = await media_service.get_resumable_upload(db, upload_id)
+    offset = await media_service.write_upload_chunk(db, session, upload_offset, request.stream())
+    return ResumableUploadStatus(
+        upload_id=upload_id,
+        offset=offset,
+        size=session.size,
+        chunk_size=settings.RESUMABLE_UPLOAD_CHUNK_SIZE
+    )
+
+@router.post("/resumable/{upload_id}/complete", dependencies=[Depends(admin_required)])
+async def complete_resumable_upload(upload_id: str, db: AsyncSession = Depends(get_db)):
+    """Verify the assembled file and move it into the media library"""
+    session = await media_service.get_resumable_upload(db, upload_id)
+    received = await media_service.complete_resumable_upload(db, upload_id)
+    return await store_received_file(
+        db, session.file_type, get_file_extension(session.filename), session.content_type, received
+    )
+
+@router.delete("/resumable/{upload_id}", dependencies=[Depends(admin_required)])
+async def abort_resumable_upload(upload_id: str, db: AsyncSession = Depends(get_db)):
+    await media_service.get_resumable_upload(db, upload_id)
+    await media_service.discard_resumable_upload(db, upload_id)
+    return {"status": "success"}
+
+@router.post("/direct", response_model=DirectUpload, status_code=201, dependencies=[Depends(admin_required)])
+async def create_direct_upload(upload: DirectUploadCreate, db: AsyncSession = Depends(get_db)):
+    """Presigned URL for uploading straight to object storage, followed by /direct/complete"""
+    check_upload_type(upload.file_type, upload.filename)
+    max_size = media_service.get_max_size(upload.file_type)
+    if upload.size > max_size:
+        raise media_service.file_too_large(upload.file_type, max_size)
+    return await media_library_service.prepare_direct_upload(
+        db, upload.file_type, get_file_extension(upload.filename), upload.size, upload.sha256, upload.content_type
+    )
+
+@router.post("/direct/complete", dependencies=[Depends(admin_required)])
+async def complete_direct_upload(upload: DirectUploadComplete, db: AsyncSession = Depends(get_db)):
+    """Verify and index an object uploaded with a presigned URL, or reference already stored content"""
+    check_upload_type(upload.file_type, upload.filename)
+    media, deduplicated, derivatives = await media_library_service.complete_direct_upload(
+        db, upload.file_type, get_file_extension(upload.filename), upload.sha256, upload.content_type
+    )
+    return upload_response(media, upload.content_type, deduplicated, derivatives)
+
+@router.get("/library", response_model=PaginatedResponse[MediaFileResponse], dependencies=[Depends(admin_required)])
+async def list_media_library(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    file_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    search: Optional[str] = Query(None, description="Substring of the filename"),
+    sort: str = Query("created_at", pattern="^(created_at|size|filename)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor, replaces skip"),
+    total: Optional[str] = Query(None, pattern="^(exact|estimate|none)$", description="How to compute the total: exact count, planner estimate, or skip it. Defaults to exact for offset pages and none for cursor pages"),
+    db: AsyncSession = Depends(get_db)
+):
+    if file_type is not None and file_type not in settings.ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    filters = dict(file_type=file_type, created_after=created_after, created_before=created_before, search=search)
+    if total is None:
+        # Cursor clients page forward without a total, so don't count every page
+        total = "none" if cursor else "exact"
+    if total == "exact":
+        total_count = await media_library_service.count_media(db, **filters)
+    elif total == "estimate":
+        total_count = await media_library_service.estimate_media_count(db, **filters)
+    else:
+        total_count = None
+    items, next_cursor = await media_library_service.list_media(
+        db, sort=sort, descending=order == "desc", skip=skip, limit=limit, cursor=cursor, **filters
+    )
+    return PaginatedResponse(
+        items=[media_library_service.media_item(media) for media in items],
+        total=total_count,
+        skip=0 if cursor else skip,
+        limit=limit,
+        next_cursor=next_cursor
+    )
 
 @router.get("/files/{file_type}", dependencies=[Depends(admin_required)])
-async def list_files(file_type: str):
+async def list_files(
+    file_type: str,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, description="All files when omitted"),
+    db: AsyncSession = Depends(get_db)
+):
     if file_type not in settings.ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Invalid file type")
     
-    upload_path = os.path.join(settings.UPLOAD_DIR, file_type)
-    if not os.path.exists(upload_path):
-        return []
-    
-    files = []
-    for filename in os.listdir(upload_path):
-        if is_allowed_file(filename, file_type):
-            files.append({
-                "url": f"{settings.SERVER_HOST}/uploads/{file_type}/{filename}",
-                "filename": filename
-            })
-    
-    return files
+    # Served from the media index, newest first; /library adds filters and cursors
+    files, _ = await media_library_service.list_media(db, file_type=file_type, skip=skip, limit=limit)
+    return [media_library_service.media_item(media) for media in files]
 
 @router.delete("/{file_type}/{filename}", dependencies=[Depends(admin_required)])
-async def delete_file(file_type: str, filename: str):
+async def delete_file(file_type: str, filename: str, db: AsyncSession = Depends(get_db)):
     if file_type not in settings.ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Invalid file type")
     
@@ -109,14 +256,21 @@ async def delete_file(file_type: str, filename: str):
             detail=f"Invalid file type. Allowed extensions: {settings.ALLOWED_EXTENSIONS[file_type]}"
         )
     
-    file_path = os.path.join(settings.UPLOAD_DIR, file_type, filename)
+    # Listings include generated images stored under images/, the index knows where each file lives
+    media = await media_library_service.find_by_name(db, file_type, filename)
+    key = media.path if media else f"{file_type}/{filename}"
     
-    if not os.path.exists(file_path):
+    if not media and not await storage.exists(key):
         raise HTTPException(status_code=404, detail="File not found")
     
     try:
-        os.remove(file_path)
-        return {"status": "success", "message": f"File {filename} deleted successfully"}
+        # Content-addressed files may back several uploads, the bytes go with the last one
+        remaining = await media_library_service.release_file(db, key, file_type)
+        return {
+            "status": "success",
+            "message": f"File {filename} deleted successfully",
+            "remaining_references": remaining
+        }
     except Exception as e:
         raise HTTPException(
             status_code=500, 
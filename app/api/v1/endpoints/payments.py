@@ -22,7 +22,7 @@ async def create_checkout_session(
     current_user: str = Depends(get_current_user)
 ):
     # Get tier details first
-    tier = db.get(Tier, tier_id)
+    tier = await db.get(Tier, tier_id)
     if not tier:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -43,7 +43,7 @@ async def create_checkout_session(
         
         # Deactivate current subscription
         existing_subscription.is_active = False
-        db.commit()
+        await db.commit()
 
     # Create Stripe checkout session for paid tier
     checkout_session = await payment_service.create_stripe_checkout_session(
@@ -1,14 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from app import db
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.models.product import Product
 from app.models.user import User
 from app.schemas.product import Product as ProductSchema, ProductCreate, ProductUpdate
 from app.services import product_service
 from typing import List
-from app.api.deps import admin_required
+from app.api.deps import admin_required, get_read_db, pin_reads_to_primary
 from app.services.product_access_service import ProductAccessService
+from app.core.http_cache import make_etag, is_not_modified, not_modified_response, set_validators
 from app.api.deps import get_current_user
 from typing import Optional
 
@@ -16,30 +16,35 @@ router = APIRouter()
 
 product_access_service = ProductAccessService()
 
-@router.post("/", response_model=ProductSchema, dependencies=[Depends(admin_required)])
-async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=ProductSchema, dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_db)):
     return await product_service.create_product(db, product)
 
 @router.get("/", response_model=List[ProductSchema])
-async def list_products(db: Session = Depends(get_db)):
+async def list_products(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    count, max_id, last_modified = await product_service.get_products_version(db)
+    etag = make_etag("products", count, max_id, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    set_validators(response, etag, last_modified)
     return await product_service.get_all_products(db)
 
-@router.put("/{product_id}", response_model=ProductSchema, dependencies=[Depends(admin_required)])
-async def update_product(product_id: int, product: ProductUpdate, db: Session = Depends(get_db)):
+@router.put("/{product_id}", response_model=ProductSchema, dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def update_product(product_id: int, product: ProductUpdate, db: AsyncSession = Depends(get_db)):
     db_product = await product_service.get_product(db, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     return await product_service.update_product(db, product_id=product_id, product_data=product)
 
-@router.delete("/{product_id}", response_model=ProductSchema, dependencies=[Depends(admin_required)])
-async def delete_product(product_id: int, db: Session = Depends(get_db)):
+@router.delete("/{product_id}", response_model=ProductSchema, dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
     db_product = await product_service.get_product(db, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     return await product_service.delete_product(db, product_id=product_id)
 
 @router.get("/{product_id}", response_model=ProductSchema)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(product_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a specific product by ID"""
     product = await product_service.get_product(db, product_id)
     if not product:
@@ -50,7 +55,7 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
 async def get_product_access(
     product_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Verify user has access through subscription
     has_access = await verify_product_access(db, current_user.clerk_id, product_id)
@@ -72,7 +77,8 @@ async def get_product_access(
 @router.post("/verify-access")
 async def verify_product_access(
     token: str,
-    origin: Optional[str] = Header(None)
+    origin: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         payload = await product_access_service.verify_access_token(token)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.models.user import User
 from app.services.stats_service import get_user_stats, get_revenue_stats
@@ -19,7 +19,7 @@ class TimeRange(str, Enum):
 @router.get("/revenue/{time_range}", dependencies=[Depends(admin_required)])
 async def get_revenue_statistics(
     time_range: TimeRange,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ): 
     logger.info(f"Getting revenue stats for time range: {time_range}")
@@ -39,7 +39,7 @@ async def get_revenue_statistics(
 
 @router.get("/revenue", dependencies=[Depends(admin_required)])
 async def get_total_revenue_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     logger.info("Getting total revenue stats")
@@ -59,7 +59,7 @@ async def get_total_revenue_stats(
 @router.get("/users/{time_range}", dependencies=[Depends(admin_required)])
 async def get_user_statistics(
     time_range: TimeRange,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get user registration statistics for a specific time range"""
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.models.tier import Tier as TierModel
 from app.schemas.tier import Tier as TierSchema, TierCreate, TierUpdate, TierWithProducts
 from app.services import tier_service
 from typing import List
-from app.api.deps import get_current_user, admin_required
+from app.core.http_cache import make_etag, is_not_modified, not_modified_response, set_validators
+from app.api.deps import get_current_user, admin_required, get_read_db, pin_reads_to_primary
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,20 +14,26 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.get("", response_model=List[TierWithProducts])
-async def get_tiers(db: Session = Depends(get_db)):
+async def get_tiers(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    version = await tier_service.get_tiers_version(db)
+    last_modified = max((value for value in (version[2], version[5]) if value is not None), default=None)
+    etag = make_etag("tiers", *version)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    set_validators(response, etag, last_modified)
     return await tier_service.get_all_tiers(db)
 
-@router.post("", response_model=TierWithProducts, dependencies=[Depends(admin_required)])
-async def create_tier(tier: TierCreate, db: Session = Depends(get_db)):
+@router.post("", response_model=TierWithProducts, dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def create_tier(tier: TierCreate, db: AsyncSession = Depends(get_db)):
     logger.info(f"Creating tier with data: {tier.model_dump()}")
     return await tier_service.create_tier(db, tier)
 
-@router.put("/{tier_id}", response_model=TierWithProducts, dependencies=[Depends(admin_required)])
-async def update_tier(tier_id: int, tier: TierUpdate, db: Session = Depends(get_db)):
+@router.put("/{tier_id}", response_model=TierWithProducts, dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def update_tier(tier_id: int, tier: TierUpdate, db: AsyncSession = Depends(get_db)):
     return await tier_service.update_tier(db, tier_id, tier)
 
-@router.delete("/{tier_id}", response_model=TierSchema, dependencies=[Depends(admin_required)])
-async def delete_tier(tier_id: int, db: Session = Depends(get_db)):
+@router.delete("/{tier_id}", response_model=TierSchema, dependencies=[Depends(admin_required), Depends(pin_reads_to_primary)])
+async def delete_tier(tier_id: int, db: AsyncSession = Depends(get_db)):
     db_tier = await tier_service.get_tier(db, tier_id)
     if not db_tier:
         raise HTTPException(status_code=404, detail="Tier not found")
@@ -1,6 +1,5 @@
 import json
 from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.user import User as UserModel
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, UserDetailsResponse
@@ -29,19 +28,19 @@ async def get_current_user_details(
     return user_details
 
 @router.post("/", response_model=UserSchema)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     db_user = await user_service.get_user_by_clerk_id(db, user.clerk_id)
     if db_user:
         raise HTTPException(status_code=400, detail="User already registered")
     return await user_service.create_user(db, user)
 
 @router.get("/", response_model=list[UserSchema], dependencies=[Depends(admin_required)])
-async def list_users(db: Session = Depends(get_db)):
+async def list_users(db: AsyncSession = Depends(get_db)):
     users = await user_service.get_all_users(db)
     return users
 
 @router.put("/{user_id}", response_model=UserSchema, dependencies=[Depends(admin_required)])
-async def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_db)):
+async def update_user(user_id: int, user: UserUpdate, db: AsyncSession = Depends(get_db)):
     db_user = await user_service.get_user(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -52,16 +51,16 @@ async def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_
     return await user_service.update_user(db, db_user, user)
 
 @router.delete("/{user_id}", response_model=UserSchema, dependencies=[Depends(admin_required)])
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     db_user = await user_service.get_user(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user_service.delete_user(db, db_user)
+    return await user_service.delete_user(db, db_user)
 
 @router.post("/sync")
 async def sync_user(
     data: Dict = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Sync user data from Clerk with our database.
@@ -75,15 +74,15 @@ async def sync_user(
     if not user_data:
         raise HTTPException(status_code=404, detail="User data not found in Clerk")
 
-    db_user = user_service.get_user_by_clerk_id(db, clerk_id)
+    db_user = await user_service.get_user_by_clerk_id(db, clerk_id)
     if not db_user:
         # Create new user
         user_create = UserCreate(clerk_id=clerk_id, **user_data)
-        db_user = user_service.create_user(db, user_create)
+        db_user = await user_service.create_user(db, user_create)
     else:
         # Update existing user
         user_update = UserUpdate(**user_data)
-        db_user = user_service.update_user(db, db_user, user_update)
+        db_user = await user_service.update_user(db, db_user, user_update)
 
     return {
         "status": "success",
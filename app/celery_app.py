@@ -5,7 +5,8 @@ from celery.schedules import crontab
 celery_app = Celery(
     'tasks',
     broker=settings.CELERY_BROKER_URL,
-    backend=settings.CELERY_RESULT_BACKEND
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=['app.jobs.update_users', 'app.jobs.translate_content', 'app.jobs.reconcile_media', 'app.jobs.reindex_blog']
 )
 
 celery_app.conf.update(
@@ -21,4 +22,12 @@ celery_app.conf.beat_schedule = {
         'task': 'app.tasks.refill_user_tokens',
         'schedule': crontab(hour=0, minute=0),  # Every day at midnight
     },
+    'rebuild-blog-tag-counts-every-day': {
+        'task': 'app.jobs.reindex_blog.reindex_blog',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'reconcile-media-index-every-day': {
+        'task': 'app.jobs.reconcile_media.reconcile_media_index',
+        'schedule': crontab(hour=3, minute=30),
+    },
 }
@@ -2,47 +2,73 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
-from jwt import PyJWKClient
 from app.core.config import settings
+from app.core.jwks import jwks_manager
+from app.core.cache import TTLCache, register_cache
+import hashlib
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
-# Initialize the JWKS client
-jwks_client = PyJWKClient(settings.CLERK_JWKS_URL)
+# Verified claims keyed by the SHA-256 of the raw token, expiring at the token's exp
+token_cache = register_cache(TTLCache(
+    "verified_tokens",
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+    default_ttl=settings.TOKEN_CACHE_MAX_TTL
+))
+
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _cache_verified_token(key: str, claims: dict) -> None:
+    exp = claims.get("exp")
+    if exp is None:
+        return
+    ttl = min(float(exp) - time.time(), settings.TOKEN_CACHE_MAX_TTL)
+    token_cache.set(key, claims, ttl)
+
+def decode_and_verify_token(token: str, signing_key: jwt.PyJWK) -> dict:
+    """Fully verify a Clerk JWT (RS256 signature, issuer, audience and expiry)"""
+    # Decode once without verification to check which audience claim is used
+    unverified_token = jwt.decode(token, options={'verify_signature': False})
+    logger.debug(f"Unverified token claims: {unverified_token}")
+
+    # If token uses azp instead of aud, use that
+    token_options = {}
+    if 'azp' in unverified_token and 'aud' not in unverified_token:
+        token_options = {'verify_aud': False}
+        logger.debug("Using azp claim instead of aud")
+
+    return jwt.decode(
+        token,
+        signing_key.key,
+        algorithms=["RS256"],
+        audience=settings.CLERK_JWT_AUDIENCE,
+        issuer=settings.CLERK_JWT_ISSUER,
+        options=token_options
+    )
 
 async def get_current_user_from_token(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
     """Validate and decode the JWT token from Clerk"""
+    token = credentials.credentials
+    cache_key = _token_cache_key(token)
+    cached_claims = token_cache.get(cache_key)
+    if cached_claims is not None:
+        return cached_claims
+
     try:
-        token = credentials.credentials
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
-        
-        # First decode without verification to check claims
-        unverified_token = jwt.decode(token, options={'verify_signature': False})
-        logger.debug(f"Unverified token claims: {unverified_token}")
-        
-        # If token uses azp instead of aud, use that
-        token_options = {}
-        if 'azp' in unverified_token and 'aud' not in unverified_token:
-            token_options = {'verify_aud': False}
-            logger.debug("Using azp claim instead of aud")
-        
-        decoded_token = jwt.decode(
-            token,
-            signing_key.key,
-            algorithms=["RS256"],
-            audience=settings.CLERK_JWT_AUDIENCE,
-            issuer=settings.CLERK_JWT_ISSUER,
-            options=token_options
-        )
-        return decoded_token
-    except jwt.InvalidTokenError as e:
+        signing_key = await jwks_manager.get_signing_key_from_jwt(token)
+        decoded_token = decode_and_verify_token(token, signing_key)
+    except jwt.PyJWTError as e:
         logger.error(f"Token validation failed: {str(e)}")
-        logger.error(f"Token claims: {jwt.decode(token, options={'verify_signature': False})}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication token"
         )
+
+    _cache_verified_token(cache_key, decoded_token)
+    return decoded_token
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 import os
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Sponge-Theory.ai API"
@@ -10,15 +10,44 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
+    # Optional streaming replica for public read paths; empty means use the primary
+    POSTGRES_READ_SERVER: str = os.getenv("POSTGRES_READ_SERVER", "")
+    DB_READ_PIN_SECONDS: int = 10  # read-your-writes window after an admin edit
     
     CLERK_SECRET_KEY: str
     STRIPE_SECRET_KEY: str
     DATABASE_URL: str
     
+    # Connection pool, applied per engine (API workers and Celery workers each get one)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    
     # Update Clerk JWT settings
     CLERK_JWKS_URL: str
     CLERK_JWT_AUDIENCE: str = os.getenv("CLERK_JWT_AUDIENCE", "")
     CLERK_JWT_ISSUER: str = os.getenv("CLERK_JWT_ISSUER", "")
+    CLERK_JWKS_REFRESH_INTERVAL: int = 3600  # seconds, capped by the JWKS max-age
+    CLERK_JWKS_MIN_REFRESH_INTERVAL: int = 30  # seconds between refetches on unknown kid
+    CLERK_JWKS_TIMEOUT: float = 5.0
+    
+    # Verified token cache
+    TOKEN_CACHE_MAX_SIZE: int = 10_000
+    TOKEN_CACHE_MAX_TTL: int = 300  # seconds, capped by the token's own exp
+    
+    # Authenticated user snapshot cache
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL: int = 60  # seconds
+    
+    # Server-side markdown rendering cache for blog posts
+    MARKDOWN_CACHE_MAX_SIZE: int = 500
+    MARKDOWN_CACHE_TTL: int = 86400  # seconds, entries are also checked against updated_at
+    
+    # Parsed content files, revalidated against the file mtime on every read
+    CONTENT_CACHE_MAX_SIZE: int = 256
+    CONTENT_CACHE_TTL: int = 3600  # seconds
     
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
     
@@ -27,6 +56,32 @@ class Settings(BaseSettings):
     # Media settings
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
     SERVER_HOST: str = os.getenv("SERVER_HOST", "http://localhost:8000")
+    
+    # Resumable uploads: suggested chunk size, and when abandoned sessions are removed
+    RESUMABLE_UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+    RESUMABLE_UPLOAD_TTL: int = 86400  # seconds without new data
+    RESUMABLE_UPLOAD_CLEANUP_INTERVAL: int = 3600  # seconds
+    
+    # Responsive image derivatives, formats missing from the Pillow build are skipped
+    IMAGE_DERIVATIVE_WIDTHS: tuple = (320, 640, 1024)
+    IMAGE_DERIVATIVE_FORMATS: tuple = ("webp", "avif")
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    
+    # /uploads caching: content-addressed files never change, other files are revalidated
+    MEDIA_CACHE_MAX_AGE: int = 3600  # seconds
+    MEDIA_IMMUTABLE_MAX_AGE: int = 31536000  # one year
+    # Internal nginx location mapped to UPLOAD_DIR, e.g. /protected-uploads/; empty serves files from the app
+    MEDIA_ACCEL_REDIRECT_PREFIX: str = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+    
+    # Media storage: "local" keeps files in UPLOAD_DIR, "s3" uses an S3-compatible bucket
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # e.g. http://minio:9000, empty for AWS
+    S3_REGION: str = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_PUBLIC_URL: str = os.getenv("S3_PUBLIC_URL", "")  # CDN or bucket URL, defaults to the endpoint
+    S3_PRESIGNED_EXPIRES: int = 900  # seconds
     ALLOWED_EXTENSIONS: dict = {
         'image': {'png', 'jpg', 'jpeg', 'gif', 'webp'},
         'video': {'mp4', 'webm', 'mov'},
@@ -43,13 +98,31 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
     
+    # Cross-worker cache invalidation over Redis pub/sub, in-process only when unset
+    INVALIDATION_REDIS_URL: str = os.getenv("INVALIDATION_REDIS_URL", "")
+    INVALIDATION_CHANNEL: str = "cache-invalidation"
+    
     CONTENT_DIR: str = os.getenv("CONTENT_DIR", "content")
     ALLOWED_CONTENT_TYPES: set = {"privacy_policy", "terms", "home"}
     DEFAULT_LOCALE: str = "en"
     
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
+    # Point at an OpenAI-compatible server, e.g. a local fake in tests
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL")
     OPENAI_MODEL: str = "gpt-4"
     OPENAI_IMAGE_MODEL: str = "dall-e-3"
+    TRANSLATION_CONCURRENCY: int = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+    
+    # Outbound OpenAI limits, per model and per process
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "4"))
+    OPENAI_TOKENS_PER_MINUTE: int = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "40000"))
+    # Per-model overrides of "concurrency" and "tpm" (0 disables the token budget)
+    OPENAI_MODEL_LIMITS: dict = {
+        "dall-e-3": {"concurrency": 2, "tpm": 0}
+    }
+    OPENAI_MAX_RETRIES: int = 5
+    OPENAI_RETRY_BASE_DELAY: float = 1.0  # seconds, doubled per attempt with full jitter
+    OPENAI_RETRY_MAX_DELAY: float = 30.0  # seconds, a longer Retry-After fails the call instead
     
     class Config:
         env_file = ".env"
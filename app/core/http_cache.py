@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+import hashlib
+from fastapi import Request, Response
+
+# Clients may keep a copy but must revalidate it, which is cheap with the validators below
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+def make_etag(*parts) -> str:
+    """Strong ETag derived from cheap version metadata (ids, timestamps, mtimes)"""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive datetimes in this app are stored as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match, then If-Modified-Since, against the current validators"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(last_modified) <= since
+    return False
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> None:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
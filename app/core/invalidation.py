@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str], None]
+
+class InvalidationBus:
+    """In-process invalidation bus, also the stand-in when no Redis is configured.
+
+    Keys look like "<prefix>" or "<prefix>:<id>" (e.g. "blog:42",
+    "principal:user_123", "content:home:en"). Handlers subscribe to a prefix
+    and receive the part after it, or "" for a bare prefix.
+    """
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._handlers: List[Tuple[str, Handler]] = []
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, prefix: str, handler: Handler) -> None:
+        self._handlers.append((prefix, handler))
+
+    def dispatch(self, key: str) -> None:
+        """Run the local handlers for a key"""
+        prefix, _, suffix = key.partition(":")
+        for handler_prefix, handler in self._handlers:
+            if handler_prefix != prefix:
+                continue
+            try:
+                handler(suffix)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {key} failed: {str(e)}")
+
+    def publish(self, key: str) -> None:
+        """Invalidate a key in this worker and every other one"""
+        self.published += 1
+        self.dispatch(key)
+        self._send(key)
+
+    def _send(self, key: str) -> None:
+        pass
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "origin": self.origin,
+            "published": self.published,
+            "received": self.received
+        }
+
+class RedisInvalidationBus(InvalidationBus):
+    """Fans invalidations out to the other workers over Redis pub/sub"""
+
+    def __init__(self, url: str, channel: str):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _message(self, key: str) -> str:
+        return json.dumps({"origin": self.origin, "key": key})
+
+    def _send(self, key: str) -> None:
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if self._queue is not None and running_loop is self._loop:
+            self._queue.put_nowait(key)
+            return
+
+        # Outside the API event loop (Celery tasks, scripts): publish synchronously
+        try:
+            client = redis.Redis.from_url(self.url)
+            try:
+                client.publish(self.channel, self._message(key))
+            finally:
+                client.close()
+        except Exception as e:
+            logger.error(f"Failed to publish invalidation for {key}: {str(e)}")
+
+    async def start(self) -> None:
+        self._redis = aioredis.Redis.from_url(self.url)
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._publish_loop())
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _publish_loop(self) -> None:
+        while True:
+            key = await self._queue.get()
+            try:
+                await self._redis.publish(self.channel, self._message(key))
+            except Exception as e:
+                logger.error(f"Failed to publish invalidation for {key}: {str(e)}")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        self._handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Missed messages are bounded by the caches' own TTLs
+                logger.error(f"Invalidation subscriber lost its connection, retrying: {str(e)}")
+                await asyncio.sleep(1)
+
+    def _handle(self, data) -> None:
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring malformed invalidation message: {data!r}")
+            return
+        # Our own messages were already applied locally when published
+        if payload.get("origin") == self.origin or not payload.get("key"):
+            return
+        self.received += 1
+        self.dispatch(payload["key"])
+
+def create_invalidation_bus() -> InvalidationBus:
+    if settings.INVALIDATION_REDIS_URL:
+        return RedisInvalidationBus(settings.INVALIDATION_REDIS_URL, settings.INVALIDATION_CHANNEL)
+    return InvalidationBus()
+
+invalidation_bus = create_invalidation_bus()
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, Optional
+
+import httpx
+import jwt
+from jwt.exceptions import PyJWKClientError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+class JWKSManager:
+    """Async JWKS cache indexed by kid.
+
+    Keys are preloaded at startup and refreshed in the background before they
+    expire. Concurrent lookups of an unknown kid share a single fetch, and
+    fetches on unknown kids are spaced by min_refresh_interval whether the
+    previous attempt succeeded or failed.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        refresh_interval: float = 3600,
+        min_refresh_interval: float = 30,
+        timeout: float = 5,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._transport = transport
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._last_attempt = float("-inf")
+        self._fetch_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def kids(self) -> list:
+        return list(self._keys)
+
+    async def start(self) -> None:
+        """Preload the key set and start the background refresh loop"""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Initial JWKS fetch failed, keys will be loaded on demand: {str(e)}")
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def refresh(self) -> None:
+        """Fetch the key set, joining an in-flight fetch if there is one"""
+        if self._fetch_task is None or self._fetch_task.done():
+            self._last_attempt = time.monotonic()
+            self._fetch_task = asyncio.create_task(self._fetch())
+        await asyncio.shield(self._fetch_task)
+
+    async def get_signing_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        key = self._lookup(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid: the keys may have rotated. Refetch, but never more often
+        # than min_refresh_interval so bogus kids cannot hammer the endpoint.
+        # Failed attempts count too, so an outage is not retried per request.
+        in_flight = self._fetch_task is not None and not self._fetch_task.done()
+        if in_flight or time.monotonic() - self._last_attempt >= self.min_refresh_interval:
+            try:
+                await self.refresh()
+            except Exception as e:
+                raise PyJWKClientError(f"Failed to fetch JWKS: {str(e)}")
+            key = self._lookup(kid)
+            if key is not None:
+                return key
+
+        raise PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+
+    async def get_signing_key_from_jwt(self, token: str) -> jwt.PyJWK:
+        header = jwt.get_unverified_header(token)
+        return await self.get_signing_key(header.get("kid"))
+
+    def _lookup(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        if kid is None:
+            # Tokens without a kid are only accepted when there is a single key
+            return next(iter(self._keys.values())) if len(self._keys) == 1 else None
+        return self._keys.get(kid)
+
+    async def _fetch(self) -> None:
+        async with httpx.AsyncClient(timeout=self.timeout, transport=self._transport) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            if jwk.get("use", "sig") != "sig" or "kid" not in jwk:
+                continue
+            try:
+                keys[jwk["kid"]] = jwt.PyJWK(jwk)
+            except jwt.PyJWTError as e:
+                logger.warning(f"Skipping unusable JWK {jwk.get('kid')}: {str(e)}")
+
+        if not keys:
+            raise PyJWKClientError("The JWKS endpoint did not return any usable signing keys")
+
+        max_age = self.refresh_interval
+        match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+        if match:
+            max_age = min(int(match.group(1)), self.refresh_interval)
+
+        self._keys = keys
+        self._last_fetch = time.monotonic()
+        self._expires_at = self._last_fetch + max_age
+        logger.info(f"Loaded {len(keys)} JWKS signing keys, valid for {max_age}s")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            # Refresh at 80% of the key set lifetime so keys never go stale
+            remaining = self._expires_at - time.monotonic()
+            delay = max(remaining * 0.8, self.min_refresh_interval)
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Background JWKS refresh failed: {str(e)}")
+
+jwks_manager = JWKSManager(
+    settings.CLERK_JWKS_URL,
+    refresh_interval=settings.CLERK_JWKS_REFRESH_INTERVAL,
+    min_refresh_interval=settings.CLERK_JWKS_MIN_REFRESH_INTERVAL,
+    timeout=settings.CLERK_JWKS_TIMEOUT
+)
@@ -0,0 +1,40 @@
+from bisect import bisect_left
+from typing import Any, Dict, Sequence
+import threading
+
+# Default latency buckets in seconds, from 1ms to 30s
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Minimal cumulative histogram for in-process latency reporting"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, bucket_count in zip(self.buckets, self._counts):
+                cumulative += bucket_count
+                buckets[f"le_{bound}"] = cumulative
+            buckets["le_inf"] = self.count
+            return {
+                "count": self.count,
+                "sum": round(self.sum, 6),
+                "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+                "max": round(self.max, 6),
+                "buckets": buckets
+            }
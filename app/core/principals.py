@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import Optional
+from app.core.config import settings
+from app.core.cache import TTLCache, register_cache
+from app.core.invalidation import invalidation_bus
+from app.models.user import User
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Lightweight, detached snapshot of the authenticated user"""
+    id: int
+    clerk_id: str
+    email: str
+    name: str
+    language: str
+    role: str
+    api_calls_count: int
+    api_max_calls: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            clerk_id=user.clerk_id,
+            email=user.email,
+            name=user.name,
+            language=user.language,
+            role=user.role,
+            api_calls_count=user.api_calls_count,
+            api_max_calls=user.api_max_calls
+        )
+
+principal_cache = register_cache(TTLCache(
+    "user_principals",
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    default_ttl=settings.PRINCIPAL_CACHE_TTL
+))
+
+invalidation_bus.subscribe("principal", principal_cache.delete)
+
+def get_cached_principal(clerk_id: str) -> Optional[UserPrincipal]:
+    return principal_cache.get(clerk_id)
+
+def cache_principal(user: User) -> UserPrincipal:
+    principal = UserPrincipal.from_user(user)
+    principal_cache.set(principal.clerk_id, principal)
+    return principal
+
+def invalidate_principal(clerk_id: Optional[str]) -> None:
+    """Drop the cached snapshot, on every worker, after any write to the user row"""
+    if clerk_id:
+        invalidation_bus.publish(f"principal:{clerk_id}")
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upstream errors worth retrying: rate limits, overload, timeouts and dropped connections
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+# 429s that waiting will not fix: the account is out of credit
+NON_RETRYABLE_CODES = {"insufficient_quota"}
+
+class TokenBucket:
+    """Tokens-per-minute budget, refilled continuously"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        # A single request larger than the whole budget waits for a full bucket
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+class ModelMetrics:
+    def __init__(self):
+        self.queue_wait = Histogram()
+        self.upstream_latency = Histogram()
+        self.in_flight = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+            "upstream_latency_seconds": self.upstream_latency.snapshot()
+        }
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the upstream through Retry-After(-Ms) headers, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class OutboundLimiter:
+    """Per-model concurrency and tokens-per-minute limits with retries for OpenAI calls.
+
+    asyncio primitives are bound to an event loop, and Celery jobs run their
+    own loops, so semaphores and buckets are created per loop. Metrics are
+    shared across loops.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        tokens_per_minute: int,
+        model_limits: Optional[Dict[str, Dict[str, int]]] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0
+    ):
+        self.concurrency = concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.model_limits = model_limits or {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics: Dict[str, ModelMetrics] = {}
+        self._primitives = weakref.WeakKeyDictionary()
+
+    def _limits(self, model: str):
+        loop = asyncio.get_running_loop()
+        per_loop = self._primitives.setdefault(loop, {})
+        if model not in per_loop:
+            limits = self.model_limits.get(model, {})
+            tokens_per_minute = limits.get("tpm", self.tokens_per_minute)
+            per_loop[model] = (
+                asyncio.Semaphore(limits.get("concurrency", self.concurrency)),
+                TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+            )
+        return per_loop[model]
+
+    def _metrics(self, model: str) -> ModelMetrics:
+        if model not in self.metrics:
+            self.metrics[model] = ModelMetrics()
+        return self.metrics[model]
+
+    @asynccontextmanager
+    async def acquire(self, model: str, tokens: int = 0):
+        """Hold one concurrency slot of the model, after spending tokens from its budget"""
+        semaphore, bucket = self._limits(model)
+        metrics = self._metrics(model)
+        queued = time.perf_counter()
+        async with semaphore:
+            if bucket is not None and tokens:
+                await bucket.acquire(tokens)
+            metrics.queue_wait.observe(time.perf_counter() - queued)
+            metrics.in_flight += 1
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                metrics.in_flight -= 1
+                metrics.upstream_latency.observe(time.perf_counter() - started)
+
+    def backoff_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None when it is not worth retrying"""
+        if getattr(error, "code", None) in NON_RETRYABLE_CODES:
+            return None
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None and retry_after > self.max_delay:
+            # Fail fast rather than hold the caller for longer than max_delay
+            return None
+        # Full jitter, but never sooner than the upstream asked for
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def call(self, model: str, request: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """Run request under the model's limits, retrying transient upstream errors.
+
+        The tokens are charged to the budget once: retries only wait for a slot.
+        """
+        metrics = self._metrics(model)
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.acquire(model, tokens if attempt == 0 else 0):
+                    return await request()
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    metrics.rate_limited += 1
+                delay = None if attempt == self.max_retries else self.backoff_delay(attempt, e)
+                if delay is None:
+                    metrics.failures += 1
+                    raise
+                metrics.retries += 1
+                logger.warning(f"{model} request failed ({type(e).__name__}), retry {attempt + 1} in {delay:.1f}s")
+                # Sleep outside the slot so other requests can use it
+                await asyncio.sleep(delay)
+            except Exception:
+                metrics.failures += 1
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {model: metrics.snapshot() for model, metrics in self.metrics.items()}
+
+def estimate_tokens(*texts: str, completion_tokens: int = 0) -> int:
+    """Rough token count (4 characters per token) used to charge the TPM budget"""
+    return sum(len(text) for text in texts) // 4 + completion_tokens
+
+openai_limiter = OutboundLimiter(
+    concurrency=settings.OPENAI_MAX_CONCURRENCY,
+    tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE,
+    model_limits=settings.OPENAI_MODEL_LIMITS,
+    max_retries=settings.OPENAI_MAX_RETRIES,
+    base_delay=settings.OPENAI_RETRY_BASE_DELAY,
+    max_delay=settings.OPENAI_RETRY_MAX_DELAY
+)
@@ -4,9 +4,10 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 import jwt
 from jwt.exceptions import PyJWTError
 from app.core.config import settings
-from app.api.deps import get_db
+from app.db.session import get_db
 from app.models.user import User
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 import logging
 from app.core.auth import get_current_user_from_token
 
@@ -14,17 +15,18 @@ logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Use the JWKS verification from auth.py"""
-    return get_current_user_from_token(credentials)
+    return await get_current_user_from_token(credentials)
 
-def get_current_user(db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+async def get_current_user(db: AsyncSession = Depends(get_db), token: dict = Depends(verify_token)):
     try:
         user_id = token.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user = db.query(User).filter(User.clerk_id == user_id).first()
+        result = await db.execute(select(User).where(User.clerk_id == user_id))
+        user = result.scalar_one_or_none()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
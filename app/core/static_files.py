@@ -0,0 +1,132 @@
+import mimetypes
+import os
+import re
+import stat
+from typing import Optional
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from app.core.config import settings
+
+# Content-addressed names (<sha256>.<ext>) and the derivatives stored under them never change
+_HASHED_NAME_RE = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]+)?$")
+_HASHED_DERIVATIVE_RE = re.compile(r"(^|/)derived/[0-9a-f]{64}/\d+\.[a-z0-9]+$")
+
+# Types worth serving from a .br/.gz sibling written at upload time
+COMPRESSIBLE_EXTENSIONS = {"svg", "json", "txt", "csv", "xml", "pdf"}
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Larger reads than Starlette's 64KB default, videos are read sequentially
+MEDIA_CHUNK_SIZE = 1024 * 1024
+
+def is_immutable(path: str) -> bool:
+    path = path.replace(os.sep, "/")
+    return bool(_HASHED_NAME_RE.match(os.path.basename(path)) or _HASHED_DERIVATIVE_RE.search(path))
+
+def cache_control(path: str) -> str:
+    if is_immutable(path):
+        return f"public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+def _accepted_encodings(request_headers: Headers) -> set:
+    """Precompressed encodings the client accepts, honouring q=0 and the * wildcard"""
+    qualities = {}
+    for part in request_headers.get("accept-encoding", "").split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    wildcard = qualities.get("*", 0.0)
+    return {encoding for encoding, _ in PRECOMPRESSED_ENCODINGS if qualities.get(encoding, wildcard) > 0}
+
+class MediaStaticFiles(StaticFiles):
+    """StaticFiles for UPLOAD_DIR with caching headers suited to media.
+
+    - Hidden paths are never served: in-progress uploads and temporary
+      files live under dot-prefixed names.
+    - Content-addressed files are cached for a year as immutable, other
+      files for MEDIA_CACHE_MAX_AGE.
+    - Byte ranges come from FileResponse, which handles single and
+      multipart ranges and If-Range; servers supporting the ASGI pathsend
+      extension send the file without going through Python.
+    - With MEDIA_ACCEL_REDIRECT_PREFIX set, the body is left to the fronting
+      nginx through X-Accel-Redirect.
+    - Compressible files are answered from a .br or .gz sibling when the
+      client accepts it and no range was requested.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if any(part.startswith(".") for part in path.replace(os.sep, "/").split("/") if part):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+
+        if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+            # nginx serves the body, including ranges, from its internal location
+            file_headers = FileResponse(full_path, stat_result=stat_result).headers
+            response = Response(status_code=status_code, headers={
+                "X-Accel-Redirect": settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative_path,
+                "Cache-Control": cache_control(relative_path),
+                "Content-Type": file_headers["content-type"],
+                "ETag": file_headers["etag"],
+                "Last-Modified": file_headers["last-modified"],
+            })
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        response = self._precompressed_response(full_path, request_headers)
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.chunk_size = MEDIA_CHUNK_SIZE
+        response.headers["Cache-Control"] = cache_control(relative_path)
+        if os.path.splitext(full_path)[1].lstrip(".").lower() in COMPRESSIBLE_EXTENSIONS:
+            response.headers["Vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _precompressed_response(self, full_path, request_headers: Headers) -> Optional[FileResponse]:
+        if "range" in request_headers:
+            return None
+        if os.path.splitext(full_path)[1].lstrip(".").lower() not in COMPRESSIBLE_EXTENSIONS:
+            return None
+        accepted = _accepted_encodings(request_headers)
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                stat_result = os.stat(f"{full_path}{suffix}")
+            except OSError:
+                continue
+            if not stat.S_ISREG(stat_result.st_mode):
+                continue
+            return FileResponse(
+                f"{full_path}{suffix}",
+                stat_result=stat_result,
+                media_type=mimetypes.guess_type(str(full_path))[0] or "application/octet-stream",
+                headers={"Content-Encoding": encoding},
+            )
+        return None
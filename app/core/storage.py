@@ -0,0 +1,396 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.static_files import COMPRESSIBLE_EXTENSIONS, PRECOMPRESSED_ENCODINGS, cache_control
+
+try:
+    import brotli
+except ImportError:  # optional, .gz variants are written either way
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# A precompressed variant is kept only if it is at least this much smaller
+PRECOMPRESS_MIN_SAVING = 0.1
+# Larger files are served uncompressed, maximum-level compression of them costs too much CPU
+PRECOMPRESS_MAX_SIZE = 32 * 1024 * 1024
+
+# Bytes read per iteration when hashing stored files
+READ_CHUNK_SIZE = 1024 * 1024
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    modified: datetime
+    # Hex SHA-256 verified by the backend, when it keeps one
+    sha256: Optional[str] = None
+
+def _extension(key: str) -> str:
+    return key.rsplit(".", 1)[1].lower() if "." in os.path.basename(key) else ""
+
+def _new_compressor(encoding: str):
+    """(compress, flush) callables of a streaming compressor, None if unavailable"""
+    if encoding == "gzip":
+        # wbits=31 writes a gzip container, with a zero mtime so the output is reproducible
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+    if encoding == "br" and brotli is not None:
+        compressor = brotli.Compressor(quality=11)
+        return compressor.process, compressor.finish
+    return None
+
+def precompress(path: str) -> List[str]:
+    """Write .br/.gz siblings of a compressible file for MediaStaticFiles; blocking.
+
+    The file is compressed in chunks, so memory use does not grow with its
+    size, and files over PRECOMPRESS_MAX_SIZE are skipped.
+    """
+    if _extension(path) not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    size = os.path.getsize(path)
+    if size > PRECOMPRESS_MAX_SIZE:
+        return []
+    written = []
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        compressor = _new_compressor(encoding)
+        if compressor is None:
+            continue
+        compress, flush = compressor
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-", suffix=".part")
+        try:
+            with open(path, "rb") as source, os.fdopen(fd, "wb") as out_file:
+                while chunk := source.read(READ_CHUNK_SIZE):
+                    out_file.write(compress(chunk))
+                out_file.write(flush())
+            if os.path.getsize(temp_path) > size * (1 - PRECOMPRESS_MIN_SAVING):
+                os.remove(temp_path)
+                continue
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, f"{path}{suffix}")
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        written.append(f"{path}{suffix}")
+    return written
+
+class StorageBackend(ABC):
+    """Where media bytes live. Keys are "/"-separated paths such as image/<sha256>.png.
+
+    Uploads are received into a local temporary file first; save() hands
+    that file over to the backend, which owns it afterwards.
+    """
+
+    name = "base"
+    supports_presigned_uploads = False
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL of an object"""
+
+    async def exists(self, key: str) -> bool:
+        return await self.stat(key) is not None
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        """Size, modification time and, when the store keeps it, SHA-256; None if missing"""
+
+    @abstractmethod
+    async def save(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        """Store a local file under key, taking ownership of the file"""
+
+    @abstractmethod
+    async def read(self, key: str) -> Optional[bytes]:
+        """Whole content of a small object, None if it does not exist"""
+
+    @abstractmethod
+    async def download(self, key: str, local_path: str) -> None:
+        """Copy an object to a local file"""
+
+    @abstractmethod
+    async def sha256(self, key: str) -> str:
+        """SHA-256 of an object, computed from its content"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove an object, missing objects are ignored"""
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        """Remove every object under prefix/"""
+
+    @abstractmethod
+    async def list(self, prefix: str) -> List[StoredObject]:
+        """Objects directly under prefix, skipping hidden names and subdirectories"""
+
+    async def presigned_upload(self, key: str, size: int, sha256: str, content_type: Optional[str]) -> dict:
+        """Optional, only called on backends with supports_presigned_uploads"""
+        raise NotImplementedError
+
+class LocalStorage(StorageBackend):
+    """Files under UPLOAD_DIR, served by the /uploads mount of each replica"""
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            stat_result = await asyncio.to_thread(os.stat, self.path(key))
+        except FileNotFoundError:
+            return None
+        return StoredObject(
+            key=key,
+            size=stat_result.st_size,
+            modified=datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+        )
+
+    async def save(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        destination = self.path(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.chmod(local_path, 0o644)
+        await asyncio.to_thread(os.replace, local_path, destination)
+        await asyncio.to_thread(precompress, destination)
+
+    async def read(self, key: str) -> Optional[bytes]:
+        try:
+            return await asyncio.to_thread(_read_file, self.path(key))
+        except FileNotFoundError:
+            return None
+
+    async def download(self, key: str, local_path: str) -> None:
+        await asyncio.to_thread(shutil.copyfile, self.path(key), local_path)
+
+    async def sha256(self, key: str) -> str:
+        return await asyncio.to_thread(_file_sha256, self.path(key))
+
+    async def delete(self, key: str) -> None:
+        path = self.path(key)
+        for target in [path] + [f"{path}{suffix}" for _, suffix in PRECOMPRESSED_ENCODINGS]:
+            try:
+                await asyncio.to_thread(os.remove, target)
+            except FileNotFoundError:
+                pass
+
+    async def delete_prefix(self, prefix: str) -> None:
+        await asyncio.to_thread(shutil.rmtree, self.path(prefix), True)
+
+    async def list(self, prefix: str) -> List[StoredObject]:
+        return await asyncio.to_thread(self._list, prefix)
+
+    def _list(self, prefix: str) -> List[StoredObject]:
+        directory = self.path(prefix)
+        if not os.path.isdir(directory):
+            return []
+        objects = []
+        for entry in os.scandir(directory):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            stat_result = entry.stat()
+            objects.append(StoredObject(
+                key=f"{prefix}/{entry.name}",
+                size=stat_result.st_size,
+                modified=datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+            ))
+        return objects
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage (AWS, MinIO, R2...), accessed through boto3.
+
+    boto3 is synchronous, so calls run in worker threads. Objects are
+    written with the Cache-Control MediaStaticFiles would send, and clients
+    can upload straight to the bucket with a presigned PUT.
+    """
+
+    name = "s3"
+    supports_presigned_uploads = True
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        public_url: Optional[str] = None,
+        presign_expires: int = 900
+    ):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.presign_expires = presign_expires
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            # Path-style addressing works with every S3-compatible server
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"} if endpoint_url else {})
+        )
+        if public_url:
+            self.public_url = public_url.rstrip("/")
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.{region or 'us-east-1'}.amazonaws.com"
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    @staticmethod
+    def _is_missing(error: Exception) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        from botocore.exceptions import ClientError
+        try:
+            head = await asyncio.to_thread(
+                self.client.head_object, Bucket=self.bucket, Key=key, ChecksumMode="ENABLED"
+            )
+        except ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+        checksum = head.get("ChecksumSHA256")
+        return StoredObject(
+            key=key,
+            size=head["ContentLength"],
+            modified=head["LastModified"],
+            # Composite checksums of multipart uploads ("...-3") are not content hashes
+            sha256=base64.b64decode(checksum).hex() if checksum and "-" not in checksum else None
+        )
+
+    async def save(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        # S3 keeps the SHA-256 for stat(), except for multipart uploads where it is a composite
+        extra_args = {"CacheControl": cache_control(key), "ChecksumAlgorithm": "SHA256"}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        try:
+            await asyncio.to_thread(self.client.upload_file, local_path, self.bucket, key, ExtraArgs=extra_args)
+        finally:
+            try:
+                os.remove(local_path)
+            except OSError:
+                pass
+
+    async def read(self, key: str) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+        try:
+            response = await asyncio.to_thread(self.client.get_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if self._is_missing(e):
+                return None
+            raise
+        return await asyncio.to_thread(response["Body"].read)
+
+    async def download(self, key: str, local_path: str) -> None:
+        await asyncio.to_thread(self.client.download_file, self.bucket, key, local_path)
+
+    async def sha256(self, key: str) -> str:
+        def digest() -> str:
+            body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+            hasher = hashlib.sha256()
+            for chunk in body.iter_chunks(READ_CHUNK_SIZE):
+                hasher.update(chunk)
+            return hasher.hexdigest()
+        return await asyncio.to_thread(digest)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        def delete_all() -> None:
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{prefix}/"):
+                keys = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+                if keys:
+                    self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": keys, "Quiet": True})
+        await asyncio.to_thread(delete_all)
+
+    async def list(self, prefix: str) -> List[StoredObject]:
+        def list_all() -> List[StoredObject]:
+            objects = []
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{prefix}/", Delimiter="/"):
+                for item in page.get("Contents", []):
+                    if os.path.basename(item["Key"]).startswith("."):
+                        continue
+                    objects.append(StoredObject(key=item["Key"], size=item["Size"], modified=item["LastModified"]))
+            return objects
+        return await asyncio.to_thread(list_all)
+
+    async def presigned_upload(self, key: str, size: int, sha256: str, content_type: Optional[str]) -> dict:
+        """Signed PUT for one object; the store rejects a body whose size or SHA-256 differs"""
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+        headers = {
+            "Cache-Control": cache_control(key),
+            "x-amz-checksum-sha256": checksum,
+        }
+        params = {
+            "Bucket": self.bucket,
+            "Key": key,
+            "ContentLength": size,
+            "CacheControl": headers["Cache-Control"],
+            "ChecksumSHA256": checksum,
+        }
+        if content_type:
+            params["ContentType"] = content_type
+            headers["Content-Type"] = content_type
+        url = await asyncio.to_thread(
+            self.client.generate_presigned_url,
+            "put_object",
+            Params=params,
+            ExpiresIn=self.presign_expires
+        )
+        return {"method": "PUT", "url": url, "headers": headers, "expires_in": self.presign_expires}
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def _file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def create_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            public_url=settings.S3_PUBLIC_URL,
+            presign_expires=settings.S3_PRESIGNED_EXPIRES
+        )
+    return LocalStorage(settings.UPLOAD_DIR, f"{settings.SERVER_HOST}/uploads")
+
+storage = create_storage()
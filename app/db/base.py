@@ -1,7 +1,10 @@
 from app.db.base_class import Base
 from app.models.relationships import tier_subscribers, tier_product_association
 from app.models.user import User
-from app.models.blog import BlogPost
+from app.models.user_subscription import UserSubscription
+from app.models.blog import BlogPost, BlogTagCount
 from app.models.payment import Payment
 from app.models.tier import Tier
 from app.models.product import Product
+from app.models.translation_memory import TranslationMemory
+from app.models.media import MediaFile, ResumableUpload
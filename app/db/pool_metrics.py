@@ -0,0 +1,54 @@
+from typing import Any, Dict
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool
+from app.core.metrics import Histogram
+
+class PoolMetrics:
+    """Checkout counters and wait-time histogram for one connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = Histogram()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.timeouts,
+            "wait_time_seconds": self.wait_time.snapshot()
+        }
+
+def instrumented_pool_class(base: type, metrics: PoolMetrics) -> type:
+    """Subclass a QueuePool variant so every checkout is timed.
+
+    Metrics live on the class, so pools recreated by engine.dispose() keep
+    reporting into the same PoolMetrics.
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.wait_time.observe(time.perf_counter() - start)
+        self.metrics.checkouts += 1
+        return connection
+
+    return type(f"Instrumented{base.__name__}", (base,), {"metrics": metrics, "_do_get": _do_get})
+
+def get_pool_stats(pool: Pool) -> Dict[str, Any]:
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "status": pool.status()
+    }
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
@@ -1,15 +1,80 @@
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from app.core.config import settings
+from app.db.pool_metrics import PoolMetrics, instrumented_pool_class
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
+_CREDENTIALS = f"{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
+SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://{_CREDENTIALS}@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{_CREDENTIALS}@{settings.POSTGRES_SERVER}/{settings.POSTGRES_DB}"
+ASYNC_READ_DATABASE_URL = f"postgresql+asyncpg://{_CREDENTIALS}@{settings.POSTGRES_READ_SERVER}/{settings.POSTGRES_DB}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+# Sync engine for Celery jobs, table creation and maintenance scripts
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=instrumented_pool_class(QueuePool, PoolMetrics("sync")),
+    **POOL_OPTIONS
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
+# Async engine used by the API so queries never block the event loop
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, PoolMetrics("async")),
+    **POOL_OPTIONS
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Read engine for public read paths, falling back to the primary without a replica
+if settings.POSTGRES_READ_SERVER:
+    read_async_engine = create_async_engine(
+        ASYNC_READ_DATABASE_URL,
+        poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, PoolMetrics("async_read")),
+        **POOL_OPTIONS
+    )
+else:
+    read_async_engine = async_engine
+ReadSessionLocal = async_sessionmaker(
+    bind=read_async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+@asynccontextmanager
+async def task_session_factory() -> AsyncIterator[async_sessionmaker]:
+    """Async sessions for code running in its own event loop, such as a Celery task.
+
+    asyncpg connections are bound to the loop that opened them, so these use a
+    throwaway NullPool engine instead of the API's pooled one.
+    """
+    task_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
     try:
-        yield db
+        yield async_sessionmaker(
+            bind=task_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
     finally:
-        db.close()
+        await task_engine.dispose()
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
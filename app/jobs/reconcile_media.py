@@ -0,0 +1,22 @@
+from app.celery_app import celery_app
+from app.db.session import task_session_factory
+from app.services import media_library_service
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _reconcile() -> dict:
+    async with task_session_factory() as Session:
+        async with Session() as db:
+            return await media_library_service.reconcile(db)
+
+@celery_app.task
+def reconcile_media_index() -> dict:
+    """Rebuild the media index from the files under UPLOAD_DIR"""
+    return asyncio.run(_reconcile())
+
+if __name__ == "__main__":
+    # python -m app.jobs.reconcile_media
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(_reconcile()))
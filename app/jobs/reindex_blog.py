@@ -0,0 +1,29 @@
+from app.celery_app import celery_app
+from app.db.base import Base  # noqa: F401, registers every model for the relationships
+from app.db.session import task_session_factory
+from app.services import blog_service
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _reindex(rebuild_vectors: bool = False) -> dict:
+    async with task_session_factory() as Session:
+        async with Session() as db:
+            # Posts written before full-text search existed have no vector yet
+            reindexed = await blog_service.reindex_search_vectors(db, only_missing=not rebuild_vectors)
+            # Resync tag counts in case posts were edited outside the service
+            tags = await blog_service.rebuild_tag_counts(db)
+    logger.info(f"Built search vectors for {reindexed} blog posts, rebuilt counts for {tags} tags")
+    return {"reindexed": reindexed, "tags": tags}
+
+@celery_app.task
+def reindex_blog(rebuild_vectors: bool = False) -> dict:
+    """Fill in missing blog search vectors and rebuild the tag counts"""
+    return asyncio.run(_reindex(rebuild_vectors))
+
+if __name__ == "__main__":
+    # python -m app.jobs.reindex_blog [--all]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(_reindex(rebuild_vectors="--all" in sys.argv[1:])))
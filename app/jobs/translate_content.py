@@ -0,0 +1,56 @@
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.db.session import task_session_factory
+from app.services import content_service, translation_service
+from openai import AsyncOpenAI
+from typing import List
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _translate_batch(task, content_types: List[str], source_locale: str, target_locales: List[str], force: bool) -> dict:
+    jobs = [(content_type, locale) for content_type in content_types for locale in target_locales if locale != source_locale]
+    progress = {"total": len(jobs), "completed": 0, "failed": 0, "results": {}}
+    semaphore = asyncio.Semaphore(settings.TRANSLATION_CONCURRENCY)
+
+    def record(content_type: str, locale: str, outcome: str) -> None:
+        progress["completed"] += 1
+        if outcome.startswith("error"):
+            progress["failed"] += 1
+        progress["results"][f"{content_type}:{locale}"] = outcome
+        task.update_state(state="PROGRESS", meta=progress)
+
+    # The job runs in its own event loop, so it gets its own OpenAI client and engine
+    async with AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL, max_retries=0) as openai_client, task_session_factory() as Session:
+        sources = {}
+        for content_type in content_types:
+            sources[content_type] = await content_service.read_content(content_type, source_locale)
+
+        async def translate(content_type: str, locale: str) -> None:
+            source = sources[content_type]
+            if not source:
+                record(content_type, locale, "error: source content not found")
+                return
+            if not force and await content_service.read_content(content_type, locale):
+                record(content_type, locale, "skipped")
+                return
+            async with semaphore:
+                try:
+                    async with Session() as db:
+                        translated = await translation_service.translate_content(db, source, locale, openai_client)
+                    await content_service.write_content(content_type, translated, locale)
+                except Exception as e:
+                    logger.error(f"Translating {content_type} to {locale} failed: {str(e)}")
+                    record(content_type, locale, f"error: {str(e)}")
+                    return
+            record(content_type, locale, "translated")
+
+        task.update_state(state="PROGRESS", meta=progress)
+        await asyncio.gather(*(translate(content_type, locale) for content_type, locale in jobs))
+    return progress
+
+@celery_app.task(bind=True)
+def translate_content_batch(self, content_types: List[str], source_locale: str, target_locales: List[str], force: bool = False) -> dict:
+    """Translate several content types into several locales, a few requests at a time"""
+    return asyncio.run(_translate_batch(self, content_types, source_locale, target_locales, force))
@@ -1,10 +1,10 @@
 from app.celery_app import celery_app
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.user import User
 from app.models.user_subscription import UserSubscription
 from app.models.tier import Tier
-from app.db.session import get_db
+from app.db.session import SessionLocal
+from app.core.principals import invalidate_principal
 from datetime import datetime, timedelta
 import logging
 
@@ -13,7 +13,8 @@ logger = logging.getLogger(__name__)
 @celery_app.task
 def refill_user_tokens():
     try:
-        with get_db() as db:  # Assuming get_db is an async context manager
+        # Celery workers are synchronous, so they use the sync session factory
+        with SessionLocal() as db:
             # Get all active subscriptions with recurring tiers
             query = (
                 select(UserSubscription)
@@ -37,6 +38,7 @@ def refill_user_tokens():
                         # Update the subscription start date to the current date
                         subscription.start_date = datetime.utcnow()
                         db.commit()
+                        invalidate_principal(user.clerk_id)
     except Exception as e:
         logger.error(f"Error refilling user tokens: {str(e)}")
         db.rollback()
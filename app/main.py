@@ -6,8 +6,12 @@ from app.api.v1.router import api_router
 from app.api.health import router as health_router
 from app.core.config import settings
 from app.core.logging_config import setup_logging
+from app.core.jwks import jwks_manager
+from app.core.invalidation import invalidation_bus
+from app.core.static_files import MediaStaticFiles
 from app.db.base import Base
-from app.db.session import engine
+from app.db.session import engine, async_engine, read_async_engine
+from app.services import media_service, image_service
 from app.middleware.error_handler import (
     error_handler_middleware,
     validation_exception_handler,
@@ -16,11 +20,13 @@ from app.middleware.error_handler import (
 from app.middleware.validation import request_validation_middleware
 from app.middleware.logging import log_request_middleware
 from app.middleware.cors import setup_cors
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import logging
 import os
 
 # Setup logging
 setup_logging()
+logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -41,7 +47,28 @@ app = FastAPI(
 )
 
 # Mount static files directory
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+app.mount("/uploads", MediaStaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+
+@app.on_event("startup")
+async def startup():
+    # Preload Clerk signing keys so the first requests do not wait on a fetch
+    await jwks_manager.start()
+    
+    # Receive cache invalidations published by the other API workers
+    await invalidation_bus.start()
+    
+    # Remove resumable uploads abandoned by their clients
+    app.state.upload_cleanup_task = asyncio.create_task(media_service.upload_cleanup_loop())
+
+@app.on_event("shutdown")
+async def shutdown():
+    await jwks_manager.stop()
+    await invalidation_bus.stop()
+    app.state.upload_cleanup_task.cancel()
+    image_service.shutdown_pool()
+    await async_engine.dispose()
+    if read_async_engine is not async_engine:
+        await read_async_engine.dispose()
 
 # Add middlewares
 app.middleware("http")(error_handler_middleware)
@@ -1,9 +1,7 @@
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.services.product_service import get_all_products
-from typing import List
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal
 from fastapi import Response
 
 def setup_cors(app):
@@ -37,17 +35,14 @@ def setup_cors(app):
 
         # For product origins, only check on verify-access endpoint
         if request.url.path.endswith("/verify-access"):
-            db = SessionLocal()
-            try:
+            async with AsyncSessionLocal() as db:
                 products = await get_all_products(db)
-                product_urls = [product.frontend_url for product in products]
-                
-                if origin not in product_urls:
-                    return Response(
-                        status_code=403,
-                        content="Origin not allowed"
-                    )
-            finally:
-                db.close()
+            product_urls = [product.frontend_url for product in products]
+            
+            if origin not in product_urls:
+                return Response(
+                    status_code=403,
+                    content="Origin not allowed"
+                )
 
         return await call_next(request)
@@ -1,6 +1,7 @@
 import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, ARRAY, Boolean
-from sqlalchemy.orm import relationship, Mapped
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, ARRAY, Boolean, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, Mapped, deferred
 from app.db.base_class import Base
 
 class BlogPost(Base):
@@ -26,6 +27,16 @@ class BlogPost(Base):
     author_id: Mapped[int] = Column(Integer, ForeignKey("users.id"))
     published: Mapped[bool] = Column(Boolean, default=False)
     in_menu: Mapped[bool] = Column(Boolean, default=False)
+    language: Mapped[str] = Column(String(length=10), nullable=False, server_default='en')
+    # Weighted title/description/content vector, maintained by blog_service
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+    
+    __table_args__ = (
+        Index("ix_blog_posts_search_vector", "search_vector", postgresql_using="gin"),
+        # Serve keyset pagination ordered by (created_at, id), with and without a published filter
+        Index("ix_blog_posts_published_created_at_id", "published", "created_at", "id"),
+        Index("ix_blog_posts_created_at_id", "created_at", "id"),
+    )
     
     # Relationship with User
     author = relationship("User", back_populates="blog_posts")
@@ -44,5 +55,13 @@ class BlogPost(Base):
             "tags": self.tags,
             "author_id": self.author_id,
             "published": self.published,
-            "in_menu": self.in_menu
-        }
\ No newline at end of file
+            "in_menu": self.in_menu,
+            "language": self.language
+        }
+
+class BlogTagCount(Base):
+    """Number of published posts per tag, maintained by blog_service"""
+    __tablename__ = "blog_tag_counts"
+
+    tag: Mapped[str] = Column(String, primary_key=True)
+    post_count: Mapped[int] = Column(Integer, nullable=False, default=0, index=True)
\ No newline at end of file
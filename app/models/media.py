@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ARRAY, Index, func
+from app.db.base_class import Base
+
+class MediaFile(Base):
+    """Index of the files stored under UPLOAD_DIR, kept in sync by the media endpoints"""
+    __tablename__ = "media_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Relative to UPLOAD_DIR, e.g. image/20240101_120000_abcd1234.png
+    path = Column(String, unique=True, nullable=False)
+    file_type = Column(String(20), nullable=False)
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=True, index=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # Uploads pointing at this content-addressed file; the bytes are deleted when it reaches 0
+    ref_count = Column(Integer, nullable=False, default=1, server_default="1")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # One index per sort order of the library listing, id breaks ties for keyset pagination
+        Index("ix_media_files_type_created_at_id", "file_type", "created_at", "id"),
+        Index("ix_media_files_type_size_id", "file_type", "size", "id"),
+        Index("ix_media_files_type_filename_id", "file_type", "filename", "id"),
+    )
+
+class ResumableUpload(Base):
+    """Resumable upload session, shared by every API replica through the database"""
+    __tablename__ = "resumable_uploads"
+
+    upload_id = Column(String(32), primary_key=True)
+    file_type = Column(String(20), nullable=False)
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=True)
+    # Bytes received so far, and the storage keys of the chunks holding them, in order
+    received = Column(BigInteger, nullable=False, default=0, server_default="0")
+    chunks = Column(ARRAY(String), nullable=False, default=list, server_default="{}")
+    # Set while one replica assembles the file, chunk writes are refused meanwhile
+    completing = Column(Boolean, nullable=False, default=False, server_default="false")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
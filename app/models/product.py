@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from app.models.relationships import tier_product_association
@@ -12,6 +12,7 @@ class Product(Base):
     cover_image = Column(String, nullable=True)
     demo_video_link = Column(String, nullable=True)
     frontend_url = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     tiers = relationship("Tier", secondary=tier_product_association, back_populates="products")
 
     def to_dict(self):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from app.models.relationships import tier_product_association, tier_subscribers
@@ -22,6 +22,7 @@ class Tier(Base):
     is_free = Column(Boolean, default=False)
     type = Column(String, default=TierType.RECURRING)
     currency = Column(String, default="USD")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
     subscribers = relationship(
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint, func
+from app.db.base_class import Base
+
+class TranslationMemory(Base):
+    """Previously translated text segments, reused when the source text is unchanged"""
+    __tablename__ = 'translation_memory'
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_hash = Column(String(64), nullable=False)
+    target_locale = Column(String(10), nullable=False)
+    model = Column(String, nullable=False)
+    source_text = Column(Text, nullable=False)
+    translated_text = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("source_hash", "target_locale", "model", name="uq_translation_memory_segment"),
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 class BlogAuthor(BaseModel):
@@ -11,6 +11,21 @@ class BlogAuthor(BaseModel):
     class Config:
         from_attributes = True
 
+class TocEntry(BaseModel):
+    level: int
+    id: str
+    title: str
+    children: List["TocEntry"] = []
+
+class RenderedContent(BaseModel):
+    """Sanitised HTML of a post body with its table of contents and anchor id -> heading map"""
+    html: str
+    toc: List[TocEntry] = []
+    anchors: Dict[str, str] = {}
+
+    class Config:
+        from_attributes = True
+
 class BlogPostBase(BaseModel):
     title: str
     content: str
@@ -19,6 +34,7 @@ class BlogPostBase(BaseModel):
     tags: List[str] = []
     published: bool = False
     in_menu: bool = False
+    language: str = 'en'
 
 class BlogPostCreate(BlogPostBase):
     pass
@@ -31,6 +47,27 @@ class BlogPostUpdate(BaseModel):
     tags: Optional[List[str]] = None
     published: Optional[bool] = None
     in_menu: Optional[bool] = None
+    language: Optional[str] = None
+
+class BlogPostSummary(BaseModel):
+    """Listing view of a post, without the content body"""
+    id: int
+    slug: str
+    title: str
+    description: str
+    image_url: Optional[str] = None
+    tags: List[str] = []
+    published: bool = False
+    in_menu: bool = False
+    language: str = 'en'
+    created_at: datetime
+    updated_at: datetime
+    reading_time: str
+    author: BlogAuthor
+    search_snippet: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 class BlogPost(BlogPostBase):
     id: int
@@ -39,6 +76,8 @@ class BlogPost(BlogPostBase):
     updated_at: datetime
     reading_time: str
     author: BlogAuthor
+    search_snippet: Optional[str] = None
+    rendered: Optional[RenderedContent] = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
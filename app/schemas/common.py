@@ -1,10 +1,11 @@
-from typing import Generic, TypeVar, List
+from typing import Generic, TypeVar, List, Optional
 from pydantic import BaseModel
 
 T = TypeVar('T')
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: List[T]
-    total: int
+    total: Optional[int] = None
     skip: int
-    limit: int 
\ No newline at end of file
+    limit: int
+    next_cursor: Optional[str] = None 
\ No newline at end of file
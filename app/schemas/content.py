@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Literal
+from typing import Any, Dict, List, Literal, Optional
 
 class Hero(BaseModel):
     title: str
@@ -23,3 +23,15 @@ class HomeContent(BaseModel):
 
 class ContentResponse(BaseModel):
     content: HomeContent
+
+class TranslationBatchRequest(BaseModel):
+    content_types: List[str]
+    source_locale: str
+    target_locales: List[str]
+    force: bool = False
+
+class TranslationJobStatus(BaseModel):
+    task_id: str
+    state: str
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
@@ -0,0 +1,50 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Dict, Optional
+
+class ResumableUploadCreate(BaseModel):
+    file_type: str
+    filename: str
+    size: int = Field(..., gt=0)
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$")
+    content_type: Optional[str] = None
+
+class ResumableUploadStatus(BaseModel):
+    upload_id: str
+    offset: int
+    size: int
+    chunk_size: int
+
+class DirectUploadCreate(BaseModel):
+    file_type: str
+    filename: str
+    size: int = Field(..., gt=0)
+    sha256: str = Field(..., pattern="^[0-9a-fA-F]{64}$")
+    content_type: Optional[str] = None
+
+class DirectUpload(BaseModel):
+    upload_required: bool
+    key: str
+    method: Optional[str] = None
+    url: Optional[str] = None
+    headers: Dict[str, str] = {}
+    expires_in: Optional[int] = None
+
+class DirectUploadComplete(BaseModel):
+    file_type: str
+    filename: str
+    sha256: str = Field(..., pattern="^[0-9a-fA-F]{64}$")
+    content_type: Optional[str] = None
+
+class MediaFileResponse(BaseModel):
+    id: int
+    url: str
+    filename: str
+    file_type: str
+    content_type: Optional[str] = None
+    size: int
+    sha256: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    ref_count: int
+    created_at: datetime
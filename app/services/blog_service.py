@@ -1,143 +1,342 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, any_
-from sqlalchemy.dialects.postgresql import ARRAY
-from app.models.blog import BlogPost
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, defer
+from sqlalchemy import select, func, update, delete, insert, case, cast, literal_column, tuple_, any_, distinct
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from fastapi import HTTPException
+from app.core.config import settings
+from app.db.estimate import estimate_rows
+from app.models.blog import BlogPost, BlogTagCount
+from app.core.invalidation import invalidation_bus
 from app.schemas.blog import BlogPostCreate, BlogPostUpdate
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
+from datetime import datetime
+import base64
+import binascii
+import json
 from slugify import slugify
 from app.utils.text import calculate_reading_time
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def create_blog_post(db: Session, post: BlogPostCreate, author_id: int) -> BlogPost:
+# Advisory lock key serializing tag count rebuilds across workers
+TAG_COUNTS_LOCK_ID = 7_290_001
+
+# Postgres text search configurations for the locales we publish in
+SEARCH_CONFIGS = {
+    "en": "english",
+    "fr": "french",
+    "de": "german",
+    "es": "spanish",
+}
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+def get_search_config(locale: Optional[str] = None) -> str:
+    """Map a locale such as 'fr' or 'fr-CA' to a text search configuration"""
+    language = (locale or settings.DEFAULT_LOCALE).split("-")[0].lower()
+    return SEARCH_CONFIGS.get(language, "simple")
+
+def build_search_vector(title, description, content, config):
+    """Title ranks over description, which ranks over the body"""
+    def weighted(text, weight):
+        return func.setweight(func.to_tsvector(config, func.coalesce(text, "")), literal_column(f"'{weight}'"))
+    
+    return weighted(title, "A").op("||")(weighted(description, "B")).op("||")(weighted(content, "C"))
+
+def _row_search_config():
+    """Per-row configuration derived from the post language, for bulk reindexing"""
+    return cast(
+        case(
+            *[(BlogPost.language == language, config) for language, config in SEARCH_CONFIGS.items()],
+            else_="simple"
+        ),
+        REGCONFIG
+    )
+
+def _search_query(search: str, locale: Optional[str] = None):
+    return func.websearch_to_tsquery(get_search_config(locale), search)
+
+def _apply_filters(
+    query,
+    tag: Optional[str] = None,
+    search: Optional[str] = None,
+    author_id: Optional[int] = None,
+    published: Optional[bool] = None,
+    locale: Optional[str] = None
+):
+    """Filters shared by the list and count queries so totals always match"""
+    if tag:
+        query = query.where(tag == any_(BlogPost.tags))
+    if search:
+        query = query.where(BlogPost.search_vector.op("@@")(_search_query(search, locale)))
+    if author_id:
+        query = query.where(BlogPost.author_id == author_id)
+    if published is not None:
+        query = query.where(BlogPost.published == published)
+    return query
+
+def _post_query(summary: bool = False):
+    """Posts with their author; summary queries leave the content body out of the SELECT"""
+    query = select(BlogPost).options(selectinload(BlogPost.author))
+    if summary:
+        query = query.options(defer(BlogPost.content, raiseload=True))
+    return query
+
+def encode_cursor(post: BlogPost) -> str:
+    """Opaque keyset cursor pointing just after the given post"""
+    raw = json.dumps([post.created_at.isoformat(), post.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, post_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def reindex_search_vectors(db: AsyncSession, only_missing: bool = True) -> int:
+    """Rebuild search vectors in bulk, e.g. for posts created before the column existed"""
+    query = update(BlogPost).values(
+        # Keep updated_at untouched, reindexing is not an edit
+        updated_at=BlogPost.updated_at,
+        search_vector=build_search_vector(
+            BlogPost.title,
+            BlogPost.description,
+            BlogPost.content,
+            _row_search_config()
+        )
+    )
+    if only_missing:
+        query = query.where(BlogPost.search_vector == None)
+    result = await db.execute(query.execution_options(synchronize_session=False))
+    await db.commit()
+    return result.rowcount
+
+def _counted_tags(published: Optional[bool], tags: Optional[List[str]]) -> Set[str]:
+    """Tags a post contributes to blog_tag_counts (only published posts count)"""
+    return set(tags or []) if published else set()
+
+async def _adjust_tag_counts(db: AsyncSession, old_tags: Set[str], new_tags: Set[str]) -> None:
+    """Apply a post's tag change to blog_tag_counts within the caller's transaction"""
+    added = new_tags - old_tags
+    removed = old_tags - new_tags
+    if added:
+        stmt = postgresql.insert(BlogTagCount).values([{"tag": tag, "post_count": 1} for tag in sorted(added)])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[BlogTagCount.tag],
+            set_={"post_count": BlogTagCount.post_count + 1}
+        ))
+    if removed:
+        await db.execute(
+            update(BlogTagCount)
+            .where(BlogTagCount.tag.in_(removed))
+            .values(post_count=BlogTagCount.post_count - 1)
+        )
+        await db.execute(delete(BlogTagCount).where(
+            BlogTagCount.tag.in_(removed),
+            BlogTagCount.post_count <= 0
+        ))
+
+async def rebuild_tag_counts(db: AsyncSession) -> int:
+    """Recompute blog_tag_counts from the posts with unnest + GROUP BY"""
+    tagged = select(func.unnest(BlogPost.tags).label("tag"), BlogPost.id.label("post_id"))\
+        .where(BlogPost.published == True)\
+        .subquery()
+    counts = select(tagged.c.tag, func.count(distinct(tagged.c.post_id)))\
+        .group_by(tagged.c.tag)
+    await db.execute(select(func.pg_advisory_xact_lock(TAG_COUNTS_LOCK_ID)))
+    await db.execute(delete(BlogTagCount))
+    result = await db.execute(
+        insert(BlogTagCount).from_select(["tag", "post_count"], counts)
+    )
+    await db.commit()
+    return result.rowcount
+
+async def create_blog_post(db: AsyncSession, post: BlogPostCreate, author_id: int) -> BlogPost:
     reading_time = calculate_reading_time(post.content)
     db_post = BlogPost(
         **post.model_dump(),
         author_id=author_id,
         slug=slugify(post.title),
-        reading_time=reading_time
+        reading_time=reading_time,
+        search_vector=build_search_vector(
+            post.title,
+            post.description,
+            post.content,
+            get_search_config(post.language)
+        )
     )
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+    await _adjust_tag_counts(db, set(), _counted_tags(post.published, post.tags))
+    await db.commit()
+    await db.refresh(db_post, ["author"])
     return db_post
 
 async def get_blog_posts(
-    db: Session,
+    db: AsyncSession,
     skip: int = 0,
     limit: int = 10,
     tag: Optional[str] = None,
     search: Optional[str] = None,
     author_id: Optional[int] = None,
-    published: bool = True
+    published: Optional[bool] = True,
+    locale: Optional[str] = None,
+    cursor: Optional[str] = None,
+    summary: bool = True
 ) -> List[BlogPost]:
-    query = db.query(BlogPost)
+    """List posts by offset, or by keyset when a cursor is given ('' for the first page)"""
+    query = _apply_filters(_post_query(summary), tag, search, author_id, published, locale)
+    order_by = [BlogPost.created_at.desc(), BlogPost.id.desc()]
     
-    if tag:
-        query = query.filter(tag == any_(BlogPost.tags))
-    if search:
-        query = query.filter(
-            or_(
-                BlogPost.title.ilike(f"%{search}%"),
-                BlogPost.description.ilike(f"%{search}%")
-            )
-        )
-    if author_id:
-        query = query.filter(BlogPost.author_id == author_id)
-    if published:
-        query = query.filter(BlogPost.published == published)
+    if cursor is not None:
+        # Keyset pages always follow (created_at, id) so cursors stay stable
+        skip = 0
+        if cursor:
+            created_at, post_id = decode_cursor(cursor)
+            query = query.where(tuple_(BlogPost.created_at, BlogPost.id) < tuple_(created_at, post_id))
+    elif search:
+        order_by.insert(0, func.ts_rank_cd(BlogPost.search_vector, _search_query(search, locale)).desc())
     
-    return query.offset(skip).limit(limit).all()
+    if not search:
+        result = await db.execute(query.order_by(*order_by).offset(skip).limit(limit))
+        return result.scalars().all()
+    
+    # Attach a highlighted snippet of the body to each match
+    snippet = func.ts_headline(
+        get_search_config(locale),
+        func.coalesce(BlogPost.content, BlogPost.description),
+        _search_query(search, locale),
+        SEARCH_HEADLINE_OPTIONS
+    )
+    query = query.add_columns(snippet.label("search_snippet")).order_by(*order_by)
+    result = await db.execute(query.offset(skip).limit(limit))
+    posts = []
+    for post, search_snippet in result.all():
+        post.search_snippet = search_snippet
+        posts.append(post)
+    return posts
 
-async def get_blog_post(db: Session, post_id: int) -> Optional[BlogPost]:
-    return  db.query(BlogPost).filter(BlogPost.id == post_id).first()
+async def get_blog_posts_page(
+    db: AsyncSession,
+    cursor: str = "",
+    limit: int = 10,
+    tag: Optional[str] = None,
+    search: Optional[str] = None,
+    author_id: Optional[int] = None,
+    published: Optional[bool] = True,
+    locale: Optional[str] = None,
+    summary: bool = True
+) -> Tuple[List[BlogPost], Optional[str]]:
+    """Keyset page of posts and the cursor of the next page, if any"""
+    posts = await get_blog_posts(
+        db,
+        limit=limit + 1,
+        tag=tag,
+        search=search,
+        author_id=author_id,
+        published=published,
+        locale=locale,
+        cursor=cursor,
+        summary=summary
+    )
+    if len(posts) <= limit:
+        return posts, None
+    posts = posts[:limit]
+    return posts, encode_cursor(posts[-1])
+
+async def get_blog_post(db: AsyncSession, post_id: int) -> Optional[BlogPost]:
+    result = await db.execute(_post_query().where(BlogPost.id == post_id))
+    return result.scalar_one_or_none()
+
+async def get_blog_post_by_slug(db: AsyncSession, slug: str) -> Optional[BlogPost]:
+    result = await db.execute(_post_query().where(BlogPost.slug == slug))
+    return result.scalar_one_or_none()
 
-async def get_blog_post_by_slug(db: Session, slug: str) -> Optional[BlogPost]:
-    return db.query(BlogPost).filter(BlogPost.slug == slug).first()
+async def get_post_version(db: AsyncSession, slug: str) -> Optional[Tuple[int, datetime]]:
+    """(id, updated_at) of a post, enough to validate cached copies without loading it"""
+    result = await db.execute(select(BlogPost.id, BlogPost.updated_at).where(BlogPost.slug == slug))
+    row = result.one_or_none()
+    return tuple(row) if row else None
 
-async def get_user_blog_posts(db: Session, author_id: int) -> List[BlogPost]:
-    return db.query(BlogPost).filter(BlogPost.author_id == author_id).all()
+async def get_user_blog_posts(db: AsyncSession, author_id: int) -> List[BlogPost]:
+    result = await db.execute(_post_query().where(BlogPost.author_id == author_id))
+    return result.scalars().all()
 
-async def update_blog_post(db: Session, db_post: BlogPost, post_update: BlogPostUpdate) -> BlogPost:
+async def update_blog_post(db: AsyncSession, db_post: BlogPost, post_update: BlogPostUpdate) -> BlogPost:
     update_data = post_update.dict(exclude_unset=True)
+    old_tags = _counted_tags(db_post.published, db_post.tags)
     if 'title' in update_data:
         update_data['slug'] = slugify(update_data['title'])
     for key, value in update_data.items():
         setattr(db_post, key, value)
-    db.commit()
-    db.refresh(db_post)
+    if update_data.keys() & {'title', 'description', 'content', 'language'}:
+        # Bind the new values: column references in an UPDATE would see the old row
+        db_post.search_vector = build_search_vector(
+            db_post.title,
+            db_post.description,
+            db_post.content,
+            get_search_config(db_post.language)
+        )
+    await _adjust_tag_counts(db, old_tags, _counted_tags(db_post.published, db_post.tags))
+    await db.commit()
+    invalidation_bus.publish(f"blog:{db_post.id}")
+    await db.refresh(db_post)
     return db_post
 
-async def delete_blog_post(db: Session, db_post: BlogPost) -> BlogPost:
-    db.delete(db_post)
-    db.commit()
+async def delete_blog_post(db: AsyncSession, db_post: BlogPost) -> BlogPost:
+    await _adjust_tag_counts(db, _counted_tags(db_post.published, db_post.tags), set())
+    await db.delete(db_post)
+    await db.commit()
+    invalidation_bus.publish(f"blog:{db_post.id}")
     return db_post
 
 async def get_posts_count(
-    db: Session,
+    db: AsyncSession,
     tag: Optional[str] = None,
     search: Optional[str] = None,
     author_id: Optional[int] = None,
-    published: bool = True
+    published: Optional[bool] = True,
+    locale: Optional[str] = None
 ) -> int:
     """Get total count of blog posts matching the given filters"""
-    query = db.query(BlogPost)
-    
-    if tag:
-        query = query.filter(tag == any_(BlogPost.tags))
-    if search:
-        query = query.filter(
-            or_(
-                BlogPost.title.ilike(f"%{search}%"),
-                BlogPost.content.ilike(f"%{search}%"),
-                BlogPost.description.ilike(f"%{search}%")
-            )
-        )
-    if author_id:
-        query = query.filter(BlogPost.author_id == author_id)
-    if published:
-        query = query.filter(BlogPost.published == published)
-    
-    return query.count()
+    query = _apply_filters(select(func.count(BlogPost.id)), tag, search, author_id, published, locale)
+    result = await db.execute(query)
+    return result.scalar_one()
+
+async def estimate_posts_count(
+    db: AsyncSession,
+    tag: Optional[str] = None,
+    search: Optional[str] = None,
+    author_id: Optional[int] = None,
+    published: Optional[bool] = True,
+    locale: Optional[str] = None
+) -> int:
+    """Planner row estimate for the filtered list, without scanning matching rows"""
+    query = _apply_filters(select(BlogPost.id), tag, search, author_id, published, locale)
+    return await estimate_rows(db, query)
 
-async def get_popular_tags(db: Session, limit: Optional[int] = None) -> List[str]:
+async def get_popular_tags(db: AsyncSession, limit: Optional[int] = None) -> List[str]:
     """Get list of unique tags ordered by frequency of use"""
     try:
-        # Get all published blog posts with tags
-        query = db.query(BlogPost.tags)\
-            .filter(BlogPost.published == True)\
-            .filter(BlogPost.tags != None)\
-            .filter(BlogPost.tags != [])
-        
-        # Get all tags from posts
-        posts_with_tags = query.all()
-        
-        # Flatten the list of tags and count occurrences
-        tag_counts = {}
-        for post_tags in posts_with_tags:
-            for tag in post_tags[0]:  # post_tags is a tuple with tags list as first element
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-        
-        # Sort tags by count
-        sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
-        
-        # Get just the tags in order
-        popular_tags = [tag for tag, count in sorted_tags]
-        
-        # Apply limit if specified
+        # Counts are maintained on every post write, so this is an indexed read
+        query = select(BlogTagCount.tag)\
+            .where(BlogTagCount.post_count > 0)\
+            .order_by(BlogTagCount.post_count.desc(), BlogTagCount.tag)
         if limit:
-            popular_tags = popular_tags[:limit]
-            
-        return popular_tags
+            query = query.limit(limit)
+        result = await db.execute(query)
+        return result.scalars().all()
         
     except Exception as e:
         logger.error(f"Error fetching popular tags: {str(e)}")
         return []
 
-async def get_menu_posts(db: Session) -> List[BlogPost]:
+async def get_menu_posts(db: AsyncSession) -> List[BlogPost]:
     """Get all published blog posts that are marked to appear in the menu"""
-    return db.query(BlogPost).filter(
+    result = await db.execute(_post_query(summary=True).where(
         BlogPost.published == True,
         BlogPost.in_menu == True
-    ).order_by(BlogPost.created_at.desc()).all()
\ No newline at end of file
+    ).order_by(BlogPost.created_at.desc()))
+    return result.scalars().all()
\ No newline at end of file
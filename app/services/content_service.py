@@ -1,34 +1,90 @@
 from fastapi import HTTPException
 import json
 import os
+import tempfile
 from pathlib import Path
 import logging
+from typing import Optional
+import aiofiles
+import aiofiles.os
 from app.core.config import settings
+from app.core.cache import TTLCache, register_cache
+from app.core.invalidation import invalidation_bus
 
 logger = logging.getLogger(__name__)
 
+# Parsed content keyed by (content_type, locale), validated against the file's mtime and size
+content_cache = register_cache(TTLCache(
+    "content",
+    maxsize=settings.CONTENT_CACHE_MAX_SIZE,
+    default_ttl=settings.CONTENT_CACHE_TTL
+))
+
+def _invalidate_cached_content(key: str) -> None:
+    content_type, _, locale = key.partition(":")
+    content_cache.delete((content_type, locale))
+
+invalidation_bus.subscribe("content", _invalidate_cached_content)
+
 async def get_content_path(content_type: str, locale: str) -> Path:
     if content_type not in settings.ALLOWED_CONTENT_TYPES:
         raise HTTPException(status_code=400, detail="Invalid content type")
     return Path(settings.CONTENT_DIR) / f"{content_type}_{locale}.json"
 
-async def read_content(content_type: str, locale: str = settings.DEFAULT_LOCALE) -> dict:
+async def get_content_stat(content_type: str, locale: str) -> Optional[os.stat_result]:
+    """File metadata used to validate cached copies of the content"""
     file_path = await get_content_path(content_type, locale)
-    if not file_path.exists():
+    try:
+        return await aiofiles.os.stat(file_path)
+    except FileNotFoundError:
+        return None
+
+async def read_content(content_type: str, locale: str = settings.DEFAULT_LOCALE) -> dict:
+    """Parsed content, shared between callers: treat the returned dict as read-only"""
+    stat = await get_content_stat(content_type, locale)
+    cache_key = (content_type, locale)
+    if stat is None:
+        content_cache.delete(cache_key)
         return {}
+
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = content_cache.get(cache_key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    file_path = await get_content_path(content_type, locale)
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
+            content = json.loads(await f.read())
     except Exception as e:
         logger.error(f"Error reading {content_type} content: {str(e)}")
         return {}
+    content_cache.set(cache_key, (version, content))
+    return content
 
 async def write_content(content_type: str, content: dict, locale: str = settings.DEFAULT_LOCALE):
+    """Replace the content file atomically so readers never see a partial write"""
+    temp_path = None
     try:
         os.makedirs(settings.CONTENT_DIR, exist_ok=True)
         file_path = await get_content_path(content_type, locale)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(content, f, ensure_ascii=False)
+        fd, temp_path = tempfile.mkstemp(dir=settings.CONTENT_DIR, prefix=f".{file_path.name}.", suffix=".tmp")
+        os.close(fd)
+        # mkstemp creates 0600 files, keep the usual permissions for the content file
+        os.chmod(temp_path, 0o644)
+        async with aiofiles.open(temp_path, "w", encoding="utf-8") as f:
+            await f.write(json.dumps(content, ensure_ascii=False))
+        await aiofiles.os.replace(temp_path, file_path)
+        temp_path = None
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error writing {content_type} content: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to update {content_type}")
+    finally:
+        invalidation_bus.publish(f"content:{content_type}:{locale}")
+        if temp_path is not None:
+            try:
+                await aiofiles.os.remove(temp_path)
+            except OSError:
+                pass
@@ -0,0 +1,173 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from PIL import Image, ImageOps, features
+from app.core.config import settings
+from app.core.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Derivatives of image/<name>.<ext> are stored under image/derived/<name>/<width>.<format>
+DERIVED_DIR = "derived"
+MANIFEST_NAME = "manifest.json"
+
+# Animated formats would lose their frames, they are served as uploaded
+SKIPPED_EXTENSIONS = {"gif"}
+
+ENCODER_OPTIONS = {
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60},
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def supported_formats() -> List[str]:
+    return [fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS if features.check(fmt)]
+
+def derived_prefix(filename: str) -> str:
+    stem = os.path.splitext(filename)[0]
+    return f"image/{DERIVED_DIR}/{stem}"
+
+def derived_url(filename: str, name: str) -> str:
+    return storage.url(f"{derived_prefix(filename)}/{name}")
+
+def _render_derivatives(source_path: str, output_dir: str, widths: List[int], formats: List[str]) -> dict:
+    """Resize and re-encode one image; runs in a worker process"""
+    with Image.open(source_path) as image:
+        os.makedirs(output_dir, exist_ok=True)
+        image = ImageOps.exif_transpose(image)
+        if image.mode == "La":
+            # Premultiplied greyscale has no direct conversion to RGBA
+            image = image.convert("LA")
+        if image.mode not in ("RGB", "RGBA"):
+            # Alpha comes as a band (LA, PA, RGBa) or as a transparency key (P, L)
+            has_alpha = bool({"A", "a"} & set(image.getbands())) or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        original_width, original_height = image.size
+
+        # Never upscale: keep the widths below the original, plus the original width
+        targets = sorted({width for width in widths if width < original_width} | {original_width})
+        variants = []
+        for width in targets:
+            height = round(original_height * width / original_width)
+            resized = image if width == original_width else image.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                name = f"{width}.{fmt}"
+                path = os.path.join(output_dir, name)
+                resized.save(path, format=fmt.upper(), **ENCODER_OPTIONS.get(fmt, {}))
+                variants.append({
+                    "width": width,
+                    "height": height,
+                    "format": fmt,
+                    "name": name,
+                    "size": os.path.getsize(path)
+                })
+
+    manifest = {
+        "source": os.path.basename(source_path),
+        "width": original_width,
+        "height": original_height,
+        "variants": variants
+    }
+    temp_path = os.path.join(output_dir, f".{MANIFEST_NAME}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, os.path.join(output_dir, MANIFEST_NAME))
+    return manifest
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Forking the threaded API process can copy held locks into the children
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _with_urls(filename: str, manifest: dict) -> dict:
+    return {
+        **manifest,
+        "variants": [
+            {**variant, "url": derived_url(filename, variant["name"])}
+            for variant in manifest["variants"]
+        ]
+    }
+
+async def get_derivatives(filename: str) -> Optional[dict]:
+    """Manifest of the stored derivatives of an image, with their URLs"""
+    data = await storage.read(f"{derived_prefix(filename)}/{MANIFEST_NAME}")
+    if data is None:
+        return None
+    try:
+        return _with_urls(filename, json.loads(data))
+    except ValueError:
+        return None
+
+async def create_derivatives(source_path: str, filename: Optional[str] = None) -> Optional[dict]:
+    """Generate responsive variants of an uploaded image, None if it is not processed.
+
+    source_path is a local copy of the image and filename its stored name,
+    which defaults to the name of source_path.
+    """
+    filename = filename or os.path.basename(source_path)
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    formats = supported_formats()
+    if extension in SKIPPED_EXTENSIONS or not formats:
+        return None
+    # Stored names are content hashes, so existing derivatives are always current
+    existing = await get_derivatives(filename)
+    if existing:
+        return existing
+
+    # Rendered next to the uploads (hidden from /uploads), then handed to the storage backend
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    output_dir = tempfile.mkdtemp(dir=settings.UPLOAD_DIR, prefix=".derived-")
+    prefix = derived_prefix(filename)
+    try:
+        manifest = await asyncio.get_running_loop().run_in_executor(
+            _get_pool(),
+            _render_derivatives,
+            source_path,
+            output_dir,
+            list(settings.IMAGE_DERIVATIVE_WIDTHS),
+            formats
+        )
+        for variant in manifest["variants"]:
+            await storage.save(
+                os.path.join(output_dir, variant["name"]),
+                f"{prefix}/{variant['name']}",
+                f"image/{variant['format']}"
+            )
+        # Written last, its presence means the variants are complete
+        await storage.save(os.path.join(output_dir, MANIFEST_NAME), f"{prefix}/{MANIFEST_NAME}", "application/json")
+    except Exception as e:
+        # The original is stored either way, derivatives are an optimisation
+        logger.error(f"Failed to create derivatives of {filename}: {str(e)}")
+        return None
+    finally:
+        await asyncio.to_thread(shutil.rmtree, output_dir, True)
+    return _with_urls(filename, manifest)
+
+async def delete_derivatives(filename: str) -> None:
+    await storage.delete_prefix(derived_prefix(filename))
+
+def image_dimensions(path: str) -> Optional[Tuple[int, int]]:
+    """Width and height read from the image header, None if Pillow cannot open it"""
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except Exception:
+        return None
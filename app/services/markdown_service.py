@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import hashlib
+import html
+import markdown
+import nh3
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.cache import TTLCache, register_cache
+from app.core.invalidation import invalidation_bus
+from app.models.blog import BlogPost
+
+MARKDOWN_EXTENSIONS = ["extra", "sane_lists", "toc"]
+
+# nh3 defaults plus heading anchors, code language classes and link titles
+SANITIZE_ATTRIBUTES = {tag: set(attributes) for tag, attributes in nh3.ALLOWED_ATTRIBUTES.items()}
+for _heading in ("h1", "h2", "h3", "h4", "h5", "h6"):
+    SANITIZE_ATTRIBUTES.setdefault(_heading, set()).add("id")
+SANITIZE_ATTRIBUTES.setdefault("code", set()).add("class")
+SANITIZE_ATTRIBUTES["a"] = SANITIZE_ATTRIBUTES.get("a", set()) | {"title"}
+SANITIZE_ATTRIBUTES["img"] = SANITIZE_ATTRIBUTES.get("img", set()) | {"title"}
+
+@dataclass(frozen=True)
+class RenderedMarkdown:
+    html: str
+    toc: List[dict] = field(default_factory=list)
+    anchors: Dict[str, str] = field(default_factory=dict)
+
+# Keyed by post id; each entry remembers the updated_at and content digest it was rendered from
+render_cache = register_cache(TTLCache(
+    "rendered_markdown",
+    maxsize=settings.MARKDOWN_CACHE_MAX_SIZE,
+    default_ttl=settings.MARKDOWN_CACHE_TTL
+))
+
+invalidation_bus.subscribe("blog", lambda post_id: render_cache.delete(int(post_id)))
+
+def _toc_entries(tokens: List[dict], anchors: Dict[str, str]) -> List[dict]:
+    entries = []
+    for token in tokens:
+        title = html.unescape(token["name"])
+        anchors[token["id"]] = title
+        entries.append({
+            "level": token["level"],
+            "id": token["id"],
+            "title": title,
+            "children": _toc_entries(token["children"], anchors)
+        })
+    return entries
+
+def render_markdown(text: Optional[str]) -> RenderedMarkdown:
+    """Convert markdown to sanitised HTML with a nested TOC and an anchor id -> heading map"""
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    body = md.convert(text or "")
+    anchors: Dict[str, str] = {}
+    toc = _toc_entries(md.toc_tokens, anchors)
+    return RenderedMarkdown(
+        html=nh3.clean(body, attributes=SANITIZE_ATTRIBUTES, link_rel="noopener noreferrer"),
+        toc=toc,
+        anchors=anchors
+    )
+
+def _content_digest(text: Optional[str]) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+async def get_rendered_post(post: BlogPost) -> RenderedMarkdown:
+    """Rendered body of a post, re-rendered only when its content actually changed"""
+    entry = render_cache.get(post.id)
+    if entry is not None and entry[0] == post.updated_at:
+        return entry[2]
+
+    # An edit that left the content alone (publish, tags...) keeps the rendering
+    digest = _content_digest(post.content)
+    if entry is not None and entry[1] == digest:
+        rendered = entry[2]
+    else:
+        rendered = await run_in_threadpool(render_markdown, post.content)
+    render_cache.set(post.id, (post.updated_at, digest, rendered))
+    return rendered
@@ -0,0 +1,414 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.storage import storage, LocalStorage
+from app.db.estimate import estimate_rows
+from app.models.media import MediaFile
+from app.services import image_service, media_service
+from datetime import datetime
+from typing import List, Optional, Tuple
+import base64
+import binascii
+import json
+import logging
+import mimetypes
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_LOCK_ID = 7_290_002
+
+SORT_COLUMNS = {
+    "created_at": MediaFile.created_at,
+    "size": MediaFile.size,
+    "filename": MediaFile.filename,
+}
+
+# Key prefixes scanned by reconcile and the file type they hold; generated images live in images/
+MEDIA_DIRECTORIES = {
+    **{file_type: file_type for file_type in settings.ALLOWED_EXTENSIONS},
+    "images": "image",
+}
+
+def media_url(media: MediaFile) -> str:
+    return storage.url(media.path)
+
+def media_item(media: MediaFile) -> dict:
+    return {
+        "id": media.id,
+        "url": media_url(media),
+        "filename": media.filename,
+        "file_type": media.file_type,
+        "content_type": media.content_type,
+        "size": media.size,
+        "sha256": media.sha256,
+        "width": media.width,
+        "height": media.height,
+        "ref_count": media.ref_count,
+        "created_at": media.created_at
+    }
+
+def _index_values(
+    key: str,
+    file_type: str,
+    size: int,
+    sha256: Optional[str],
+    content_type: Optional[str],
+    dimensions: Optional[Tuple[int, int]]
+) -> dict:
+    width, height = dimensions or (None, None)
+    return dict(
+        path=key,
+        file_type=file_type,
+        filename=key.rsplit("/", 1)[-1],
+        content_type=content_type,
+        size=size,
+        sha256=sha256,
+        width=width,
+        height=height
+    )
+
+async def _upsert_file(
+    db: AsyncSession,
+    key: str,
+    file_type: str,
+    size: int,
+    sha256: Optional[str],
+    content_type: Optional[str] = None,
+    created_at: Optional[datetime] = None
+) -> MediaFile:
+    """Refresh the metadata of a file on disk, leaving its reference count alone"""
+    dimensions = None
+    # Reading dimensions from a remote store would mean downloading every image
+    if file_type == "image" and isinstance(storage, LocalStorage):
+        dimensions = await run_in_threadpool(image_service.image_dimensions, storage.path(key))
+    values = _index_values(key, file_type, size, sha256, content_type, dimensions)
+    if created_at is not None:
+        values["created_at"] = created_at
+    query = insert(MediaFile).values(**values)
+    query = query.on_conflict_do_update(
+        index_elements=["path"],
+        set_={key: query.excluded[key] for key in values if key != "path"}
+    ).returning(MediaFile)
+    return (await db.execute(query)).scalar_one()
+
+async def find_by_hash(db: AsyncSession, file_type: str, sha256: str) -> Optional[MediaFile]:
+    """Indexed file of the given type holding exactly these bytes, if any"""
+    query = select(MediaFile)\
+        .where(MediaFile.file_type == file_type, MediaFile.sha256 == sha256.lower())\
+        .order_by(MediaFile.id)\
+        .limit(1)
+    return (await db.execute(query)).scalar_one_or_none()
+
+async def find_by_name(db: AsyncSession, file_type: str, filename: str) -> Optional[MediaFile]:
+    """Indexed file listed under this name, whichever directory of the file type holds it"""
+    paths = [f"{directory}/{filename}" for directory, kind in MEDIA_DIRECTORIES.items() if kind == file_type]
+    query = select(MediaFile)\
+        .where(MediaFile.path.in_(paths))\
+        .order_by(MediaFile.id)\
+        .limit(1)
+    return (await db.execute(query)).scalar_one_or_none()
+
+async def add_reference(
+    db: AsyncSession,
+    key: str,
+    file_type: str,
+    size: int,
+    sha256: str,
+    content_type: Optional[str] = None,
+    dimensions: Optional[Tuple[int, int]] = None
+) -> MediaFile:
+    """Count one more upload of a content-addressed file, indexing it on first use.
+
+    Call this before saving the bytes to storage: it waits on the row lock
+    held by a concurrent release_file, so a file being deleted is either
+    kept or re-created, never lost under a live reference.
+    """
+    query = insert(MediaFile).values(**_index_values(key, file_type, size, sha256, content_type, dimensions))
+    query = query.on_conflict_do_update(
+        index_elements=["path"],
+        set_={"ref_count": MediaFile.ref_count + 1}
+    ).returning(MediaFile)
+    media = (await db.execute(query)).scalar_one()
+    await db.commit()
+    return media
+
+async def release_file(db: AsyncSession, key: str, file_type: str) -> int:
+    """Drop one reference to a file, deleting its bytes when none remain.
+
+    Returns the number of references left. Files missing from the index
+    count as a single reference.
+    """
+    query = select(MediaFile).where(MediaFile.path == key).with_for_update()
+    media = (await db.execute(query)).scalar_one_or_none()
+    remaining = media.ref_count - 1 if media else 0
+    if remaining > 0:
+        media.ref_count = remaining
+    else:
+        if media:
+            await db.delete(media)
+            await db.flush()
+        # Removed while the row is still locked, see add_reference
+        await storage.delete(key)
+        # Derivatives are keyed by content, a generated image may share them with an upload
+        if file_type == "image" and not (media and await find_by_hash(db, file_type, media.sha256)):
+            await image_service.delete_derivatives(key.rsplit("/", 1)[-1])
+    await db.commit()
+    return remaining
+
+def encode_cursor(media: MediaFile, sort: str) -> str:
+    """Opaque keyset cursor pointing just after the given file in the given sort order"""
+    value = getattr(media, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, media.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, media_id = json.loads(raw)
+        if cursor_sort != sort:
+            raise ValueError("cursor belongs to another sort order")
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+        return value, int(media_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _apply_filters(
+    query,
+    file_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    search: Optional[str] = None
+):
+    if file_type:
+        query = query.where(MediaFile.file_type == file_type)
+    if created_after:
+        query = query.where(MediaFile.created_at >= created_after)
+    if created_before:
+        query = query.where(MediaFile.created_at < created_before)
+    if search:
+        query = query.where(MediaFile.filename.ilike(f"%{search}%"))
+    return query
+
+async def list_media(
+    db: AsyncSession,
+    file_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    search: Optional[str] = None,
+    sort: str = "created_at",
+    descending: bool = True,
+    skip: int = 0,
+    limit: Optional[int] = 50,
+    cursor: Optional[str] = None
+) -> Tuple[List[MediaFile], Optional[str]]:
+    """One page of the index and the cursor of the next page, None on the last page"""
+    column = SORT_COLUMNS[sort]
+    query = _apply_filters(select(MediaFile), file_type, created_after, created_before, search)
+    if cursor:
+        key = tuple_(column, MediaFile.id)
+        value = decode_cursor(cursor, sort)
+        query = query.where(key < value if descending else key > value)
+    elif skip:
+        query = query.offset(skip)
+    if descending:
+        query = query.order_by(column.desc(), MediaFile.id.desc())
+    else:
+        query = query.order_by(column, MediaFile.id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    items = list((await db.execute(query)).scalars().all())
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1], sort)
+    return items, next_cursor
+
+async def count_media(
+    db: AsyncSession,
+    file_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    search: Optional[str] = None
+) -> int:
+    query = _apply_filters(select(func.count(MediaFile.id)), file_type, created_after, created_before, search)
+    return (await db.execute(query)).scalar_one()
+
+async def estimate_media_count(
+    db: AsyncSession,
+    file_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    search: Optional[str] = None
+) -> int:
+    """Planner row estimate for the filtered index, without scanning matching rows"""
+    query = _apply_filters(select(MediaFile.id), file_type, created_after, created_before, search)
+    return await estimate_rows(db, query)
+
+async def reconcile(db: AsyncSession) -> dict:
+    """Bring the index in line with the files in storage.
+
+    Files are hashed only when they are new or their size changed, and
+    content-addressed names are trusted, so a rerun over an up-to-date index
+    only lists the files. Concurrent runs, e.g. several workers starting at
+    once, are serialised.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(RECONCILE_LOCK_ID)))
+    indexed = dict((await db.execute(select(MediaFile.path, MediaFile.size))).all())
+    stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    seen = set()
+
+    for directory, file_type in MEDIA_DIRECTORIES.items():
+        allowed = settings.ALLOWED_EXTENSIONS[file_type]
+        # Only top-level files: derivatives live under derived/
+        for stored in await storage.list(directory):
+            name = stored.key.rsplit("/", 1)[-1]
+            if media_service.get_file_extension(name) not in allowed:
+                continue
+            seen.add(stored.key)
+            if indexed.get(stored.key) == stored.size:
+                stats["unchanged"] += 1
+                continue
+            stem = name.split(".", 1)[0]
+            sha256 = stem if media_service.SHA256_RE.match(stem) else await storage.sha256(stored.key)
+            await _upsert_file(
+                db,
+                stored.key,
+                file_type,
+                stored.size,
+                sha256,
+                content_type=mimetypes.guess_type(name)[0],
+                created_at=stored.modified
+            )
+            stats["updated" if stored.key in indexed else "added"] += 1
+
+    missing = [path for path in indexed if path not in seen]
+    for start in range(0, len(missing), 1000):
+        await db.execute(delete(MediaFile).where(MediaFile.path.in_(missing[start:start + 1000])))
+    await db.commit()
+    stats["removed"] = len(missing)
+    logger.info(f"Reconciled media index: {stats}")
+    return stats
+
+def _filename(key: str) -> str:
+    return key.rsplit("/", 1)[-1]
+
+async def store_file(
+    db: AsyncSession,
+    file_type: str,
+    directory: str,
+    extension: str,
+    content_type: Optional[str],
+    received: media_service.StoredFile
+) -> Tuple[MediaFile, bool, Optional[dict]]:
+    """Hand a received temporary file to storage under its content hash and count the reference.
+
+    Returns the index entry, whether the bytes were already stored, and the
+    image derivatives if any.
+    """
+    existing = await find_by_hash(db, file_type, received.sha256)
+    # Same bytes under another extension (jpg/jpeg) or directory (images/) still share one file;
+    # deletes find it through the index row, see find_by_name
+    key = existing.path if existing else f"{directory}/{media_service.content_filename(received.sha256, extension)}"
+    dimensions = None
+    if file_type == "image":
+        dimensions = await run_in_threadpool(image_service.image_dimensions, received.path)
+    try:
+        media = await add_reference(db, key, file_type, received.size, received.sha256, content_type, dimensions)
+    except BaseException:
+        await media_service.discard_file(received.path)
+        raise
+    try:
+        deduplicated = await storage.exists(key)
+        derivatives = None
+        if file_type == "image":
+            derivatives = await image_service.create_derivatives(received.path, _filename(key))
+        if deduplicated:
+            await media_service.discard_file(received.path)
+        else:
+            await storage.save(received.path, key, content_type)
+    except BaseException:
+        await media_service.discard_file(received.path)
+        await release_file(db, key, file_type)
+        raise
+    return media, deduplicated, derivatives
+
+async def reference_existing(db: AsyncSession, file_type: str, sha256: str) -> Optional[Tuple[MediaFile, Optional[dict]]]:
+    """Count one more reference to stored content without receiving it again, None if it is not stored"""
+    existing = await find_by_hash(db, file_type, sha256)
+    if not existing or not await storage.exists(existing.path):
+        return None
+    media = await add_reference(db, existing.path, file_type, existing.size, existing.sha256)
+    derivatives = await image_service.get_derivatives(media.filename) if file_type == "image" else None
+    return media, derivatives
+
+async def prepare_direct_upload(
+    db: AsyncSession,
+    file_type: str,
+    extension: str,
+    size: int,
+    sha256: str,
+    content_type: Optional[str]
+) -> dict:
+    """Presigned upload straight to the storage backend, unless the content is already stored"""
+    if not storage.supports_presigned_uploads:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Direct uploads are not supported by the {storage.name} storage backend, use resumable uploads"
+        )
+    existing = await find_by_hash(db, file_type, sha256)
+    if existing and await storage.exists(existing.path):
+        return {"upload_required": False, "key": existing.path}
+    key = f"{file_type}/{media_service.content_filename(sha256.lower(), extension)}"
+    upload = await storage.presigned_upload(key, size, sha256.lower(), content_type)
+    return {"upload_required": True, "key": key, **upload}
+
+async def complete_direct_upload(
+    db: AsyncSession,
+    file_type: str,
+    extension: str,
+    sha256: str,
+    content_type: Optional[str]
+) -> Tuple[MediaFile, bool, Optional[dict]]:
+    """Index an object the client uploaded with a presigned request, once its content is verified.
+
+    Also completes uploads prepare_direct_upload found already stored, in
+    which case only a reference is added.
+    """
+    sha256 = sha256.lower()
+    existing = await find_by_hash(db, file_type, sha256)
+    key = existing.path if existing else f"{file_type}/{media_service.content_filename(sha256, extension)}"
+    stored = await storage.stat(key)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    max_size = media_service.get_max_size(file_type)
+    # Stores that keep no checksum of the object fall back to hashing it here
+    actual = stored.sha256 or await storage.sha256(key)
+    if stored.size > max_size or actual != sha256:
+        if not existing:
+            await storage.delete(key)
+        if stored.size > max_size:
+            raise media_service.file_too_large(file_type, max_size)
+        raise HTTPException(status_code=400, detail="Checksum mismatch, the upload was discarded")
+
+    if file_type != "image":
+        media = await add_reference(db, key, file_type, stored.size, sha256, content_type)
+        return media, existing is not None, None
+
+    # Dimensions and derivatives need the pixels, images are small enough to fetch once
+    local = media_service.StoredFile(path=media_service.new_temp_file(), size=stored.size, sha256=sha256)
+    try:
+        await storage.download(key, local.path)
+        dimensions = await run_in_threadpool(image_service.image_dimensions, local.path)
+        media = await add_reference(db, key, file_type, stored.size, sha256, content_type, dimensions)
+        derivatives = await image_service.create_derivatives(local.path, _filename(key))
+    finally:
+        await media_service.discard_file(local.path)
+    return media, existing is not None, derivatives
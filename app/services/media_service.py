@@ -0,0 +1,453 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import AsyncIterator, List, Optional
+from fastapi import HTTPException, Request
+from sqlalchemy import update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+import aiofiles
+import aiofiles.os
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+from app.core.config import settings
+from app.core.storage import storage
+from app.db.session import AsyncSessionLocal
+from app.models.media import ResumableUpload
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload and written to disk per iteration
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Allowance for multipart boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Storage prefix of the chunks of in-progress resumable uploads
+PARTIAL_DIR = ".partial"
+
+# Received files waiting to be handed to the storage backend
+INCOMING_DIR = ".incoming"
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+
+@dataclass
+class StoredFile:
+    path: str
+    size: int
+    sha256: str
+
+def get_max_size(file_type: str) -> int:
+    max_size = settings.MAX_FILE_SIZE.get(file_type)
+    if not max_size:
+        raise HTTPException(status_code=400, detail=f"Invalid file type: {file_type}")
+    return max_size
+
+def file_too_large(file_type: str, max_size: int) -> HTTPException:
+    readable_size = f"{max_size / 1_000_000:.1f}MB"
+    return HTTPException(
+        status_code=400,
+        detail=f"File too large. Maximum size for {file_type} is {readable_size}"
+    )
+
+def check_content_length(content_length: Optional[str], file_type: str) -> None:
+    """Reject obviously oversized requests before reading the body"""
+    max_size = get_max_size(file_type)
+    if content_length and content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise file_too_large(file_type, max_size)
+
+def new_temp_file() -> str:
+    """Empty local file receiving bytes before they are handed to the storage backend"""
+    directory = os.path.join(settings.UPLOAD_DIR, INCOMING_DIR)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    os.close(fd)
+    # mkstemp creates 0600 files, uploads are served publicly
+    os.chmod(temp_path, 0o644)
+    return temp_path
+
+async def discard_file(path: str) -> None:
+    try:
+        await aiofiles.os.remove(path)
+    except OSError:
+        pass
+
+class MultipartUpload:
+    """The file part of a multipart/form-data request, parsed as the body arrives.
+
+    Starlette's form parsing spools the whole body before the endpoint runs;
+    this reads the request stream directly, so the filename is known before
+    any content is received and the size limit holds for chunked bodies too.
+    Other fields and any later parts are ignored.
+    """
+
+    def __init__(self, request: Request, field_name: str = "file"):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+        self.field_name = field_name.encode("utf-8")
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._stream = request.stream()
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._in_file = False
+        self._file_complete = False
+        # File content parsed from the last request chunk, waiting to be consumed
+        self._pending: List[bytes] = []
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self.filename is None and options.get(b"name") == self.field_name and b"filename" in options:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1") or None
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._file_complete = True
+
+    async def _feed(self) -> bool:
+        """Parse the next chunk of the request body, False once the body is exhausted"""
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            return False
+        try:
+            self._parser.write(chunk)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        return True
+
+    async def read_headers(self) -> str:
+        """Receive the body up to the headers of the file part and return its filename"""
+        while self.filename is None:
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail=f"No file in the '{self.field_name.decode()}' field")
+        return self.filename
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Content of the file part, as it is received"""
+        await self.read_headers()
+        while True:
+            pending, self._pending = self._pending, []
+            for chunk in pending:
+                yield chunk
+            if self._file_complete:
+                return
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail="Incomplete multipart body")
+
+async def receive_upload(upload: MultipartUpload, file_type: str) -> StoredFile:
+    """Stream an upload to a local temporary file as it is received.
+
+    The size limit is enforced as bytes arrive and the SHA-256 is computed in
+    the same pass, so the content-addressed name is known once the body is
+    read. The caller hands the file to the storage backend.
+    """
+    max_size = get_max_size(file_type)
+    temp_path = new_temp_file()
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out_file:
+            async for chunk in upload.chunks():
+                size += len(chunk)
+                if size > max_size:
+                    raise file_too_large(file_type, max_size)
+                digest.update(chunk)
+                await out_file.write(chunk)
+    except BaseException:
+        await discard_file(temp_path)
+        raise
+    return StoredFile(path=temp_path, size=size, sha256=digest.hexdigest())
+
+async def write_temp_file(data: bytes) -> StoredFile:
+    """Write bytes already in memory to a local temporary file"""
+    temp_path = new_temp_file()
+    try:
+        async with aiofiles.open(temp_path, "wb") as out_file:
+            await out_file.write(data)
+    except BaseException:
+        await discard_file(temp_path)
+        raise
+    return StoredFile(path=temp_path, size=len(data), sha256=hashlib.sha256(data).hexdigest())
+
+def get_file_extension(filename: str) -> str:
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+def content_filename(sha256: str, extension: str) -> str:
+    """Content-addressed name: identical bytes always map to the same file"""
+    return f"{sha256}.{extension}" if extension else sha256
+
+def _check_upload_id(upload_id: str) -> None:
+    if not _UPLOAD_ID_RE.match(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+def _chunk_prefix(upload_id: str) -> str:
+    return f"{PARTIAL_DIR}/{upload_id}"
+
+async def create_resumable_upload(
+    db: AsyncSession,
+    file_type: str,
+    filename: str,
+    size: int,
+    sha256: Optional[str] = None,
+    content_type: Optional[str] = None
+) -> ResumableUpload:
+    max_size = get_max_size(file_type)
+    if size > max_size:
+        raise file_too_large(file_type, max_size)
+    upload = ResumableUpload(
+        upload_id=uuid.uuid4().hex,
+        file_type=file_type,
+        filename=filename,
+        size=size,
+        sha256=sha256.lower() if sha256 else None,
+        content_type=content_type,
+        received=0,
+        chunks=[],
+        completing=False
+    )
+    db.add(upload)
+    await db.commit()
+    return upload
+
+async def get_resumable_upload(db: AsyncSession, upload_id: str) -> ResumableUpload:
+    _check_upload_id(upload_id)
+    upload = await db.get(ResumableUpload, upload_id, populate_existing=True)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+async def write_upload_chunk(
+    db: AsyncSession,
+    upload: ResumableUpload,
+    offset: int,
+    chunks: AsyncIterator[bytes]
+) -> int:
+    """Store a chunk at offset, which must equal the current offset. Returns the new offset.
+
+    Each chunk becomes its own object in the storage backend, so any replica
+    can take the next one. A chunk is recorded only if the session is still
+    at offset when it has been stored; a concurrent writer that lost the
+    race gets a 409 and its object is removed.
+    """
+    upload_id = upload.upload_id
+    if upload.completing:
+        raise HTTPException(status_code=409, detail="Upload is being completed")
+    if offset != upload.received:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Offset mismatch", "offset": upload.received}
+        )
+    remaining = upload.size - offset
+    # Don't hold a database connection while the body streams in
+    await db.commit()
+
+    temp_path = new_temp_file()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out_file:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > remaining:
+                    raise HTTPException(status_code=400, detail="Chunk exceeds the declared upload size")
+                await out_file.write(chunk)
+        if not size:
+            await discard_file(temp_path)
+            return offset
+        key = f"{_chunk_prefix(upload_id)}/{offset:020d}-{uuid.uuid4().hex[:8]}"
+        await storage.save(temp_path, key)
+    except BaseException:
+        await discard_file(temp_path)
+        raise
+
+    result = await db.execute(
+        update(ResumableUpload)
+        .where(
+            ResumableUpload.upload_id == upload_id,
+            ResumableUpload.received == offset,
+            ResumableUpload.completing == False
+        )
+        .values(
+            received=ResumableUpload.received + size,
+            chunks=func.array_append(ResumableUpload.chunks, key),
+            updated_at=func.now()
+        )
+        .returning(ResumableUpload.received)
+    )
+    new_offset = result.scalar_one_or_none()
+    await db.commit()
+    if new_offset is None:
+        await storage.delete(key)
+        current = await get_resumable_upload(db, upload_id)
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Offset mismatch", "offset": current.received}
+        )
+    return new_offset
+
+async def _assemble_chunks(keys: List[str]) -> StoredFile:
+    """Concatenate stored chunks into a local temporary file, hashing them on the way"""
+    temp_path = new_temp_file()
+    part_path = new_temp_file()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out_file:
+            for key in keys:
+                await storage.download(key, part_path)
+                async with aiofiles.open(part_path, "rb") as part:
+                    while chunk := await part.read(UPLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        digest.update(chunk)
+                        await out_file.write(chunk)
+    except BaseException:
+        await discard_file(temp_path)
+        raise
+    finally:
+        await discard_file(part_path)
+    return StoredFile(path=temp_path, size=size, sha256=digest.hexdigest())
+
+async def complete_resumable_upload(db: AsyncSession, upload_id: str) -> StoredFile:
+    """Assemble the chunks into a local temporary file and verify its size and hash"""
+    _check_upload_id(upload_id)
+    # Claim the session so that a single replica assembles it
+    result = await db.execute(
+        update(ResumableUpload)
+        .where(
+            ResumableUpload.upload_id == upload_id,
+            ResumableUpload.received == ResumableUpload.size,
+            ResumableUpload.completing == False
+        )
+        .values(completing=True, updated_at=func.now())
+        .returning(ResumableUpload.chunks, ResumableUpload.size, ResumableUpload.sha256)
+    )
+    claimed = result.one_or_none()
+    await db.commit()
+    if claimed is None:
+        upload = await get_resumable_upload(db, upload_id)
+        if upload.completing:
+            raise HTTPException(status_code=409, detail="Upload is already being completed")
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload is incomplete", "offset": upload.received, "size": upload.size}
+        )
+
+    keys, size, expected_sha256 = claimed
+    try:
+        received = await _assemble_chunks(keys)
+    except BaseException:
+        # Let the client retry the completion
+        await db.execute(
+            update(ResumableUpload)
+            .where(ResumableUpload.upload_id == upload_id)
+            .values(completing=False)
+        )
+        await db.commit()
+        raise
+
+    if received.size != size:
+        await discard_file(received.path)
+        await discard_resumable_upload(db, upload_id)
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Size mismatch, the upload was discarded",
+                "expected": size,
+                "received": received.size
+            }
+        )
+    if expected_sha256 and received.sha256 != expected_sha256:
+        await discard_file(received.path)
+        await discard_resumable_upload(db, upload_id)
+        raise HTTPException(status_code=400, detail="Checksum mismatch, the upload was discarded")
+    await discard_resumable_upload(db, upload_id)
+    return received
+
+async def discard_resumable_upload(db: AsyncSession, upload_id: str) -> None:
+    _check_upload_id(upload_id)
+    await db.execute(delete(ResumableUpload).where(ResumableUpload.upload_id == upload_id))
+    await db.commit()
+    await storage.delete_prefix(_chunk_prefix(upload_id))
+
+def _cleanup_incoming(cutoff: float) -> None:
+    """Drop received files a crashed worker never handed to the storage backend"""
+    directory = os.path.join(settings.UPLOAD_DIR, INCOMING_DIR)
+    if not os.path.isdir(directory):
+        return
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            continue
+
+async def cleanup_stale_uploads(db: AsyncSession, max_age: float) -> int:
+    """Remove resumable uploads that received no data for max_age seconds"""
+    await asyncio.to_thread(_cleanup_incoming, time.time() - max_age)
+    result = await db.execute(
+        delete(ResumableUpload)
+        .where(ResumableUpload.updated_at < func.now() - timedelta(seconds=max_age))
+        .returning(ResumableUpload.upload_id)
+    )
+    upload_ids = result.scalars().all()
+    await db.commit()
+    for upload_id in upload_ids:
+        await storage.delete_prefix(_chunk_prefix(upload_id))
+    return len(upload_ids)
+
+async def upload_cleanup_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.RESUMABLE_UPLOAD_CLEANUP_INTERVAL)
+        try:
+            async with AsyncSessionLocal() as db:
+                removed = await cleanup_stale_uploads(db, settings.RESUMABLE_UPLOAD_TTL)
+            if removed:
+                logger.info(f"Removed {removed} abandoned resumable uploads")
+        except Exception as e:
+            logger.error(f"Resumable upload cleanup failed: {str(e)}")
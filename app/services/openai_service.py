@@ -1,37 +1,73 @@
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.metrics import Histogram
+from app.core.rate_limit import openai_limiter, estimate_tokens
+from typing import AsyncIterator, Dict, Optional
+import json
 import logging
+import re
 
 logger = logging.getLogger(__name__)
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+# Retries are handled by openai_limiter, which honours Retry-After across all callers
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL, max_retries=0)
 
-async def translate_content(content: dict, target_locale: str) -> dict:
+# Time to first streamed token of markdown generation, in seconds
+markdown_ttft = Histogram()
+
+_JSON_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
+def parse_json_response(text: str) -> dict:
+    """Parse a model reply that should be a single JSON object, tolerating a code fence"""
+    text = text.strip()
+    match = _JSON_FENCE_RE.match(text)
+    if match:
+        text = match.group(1)
+    parsed = json.loads(text)
+    if not isinstance(parsed, dict):
+        raise ValueError("Expected a JSON object")
+    return parsed
+
+async def translate_segments(
+    segments: Dict[str, str],
+    target_locale: str,
+    openai_client: Optional[AsyncOpenAI] = None
+) -> Dict[str, str]:
+    """Translate a {id: text} map of independent text segments, keeping the ids"""
     try:
-        # Prepare the content for translation
-        content_str = str(content)
-        response = await client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": f"Translate the following content to {target_locale}. Maintain the JSON structure and only translate text values."},
-                {"role": "user", "content": content_str}
-            ]
+        source = json.dumps(segments, ensure_ascii=False)
+        response = await openai_limiter.call(
+            settings.OPENAI_MODEL,
+            lambda: (openai_client or client).chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": f"Translate each value of the following JSON object to {target_locale}. Keep the keys unchanged, preserve markdown and placeholders, and reply with the JSON object only."},
+                    {"role": "user", "content": source}
+                ]
+            ),
+            # The translation is about as long as the source
+            tokens=estimate_tokens(source, source)
         )
         
-        # Parse the response back to dict
-        translated_content = eval(response.choices[0].message.content)
-        return translated_content
+        translated = parse_json_response(response.choices[0].message.content)
+        missing = segments.keys() - translated.keys()
+        if missing:
+            raise ValueError(f"Translation is missing {len(missing)} segments")
+        return {key: str(translated[key]) for key in segments}
     except Exception as e:
         logger.error(f"Translation error: {str(e)}")
         raise
 
 async def generate_image(prompt: str) -> str:
     try:
-        response = await client.images.generate(
-            model=settings.OPENAI_IMAGE_MODEL,
-            prompt=prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1,
+        response = await openai_limiter.call(
+            settings.OPENAI_IMAGE_MODEL,
+            lambda: client.images.generate(
+                model=settings.OPENAI_IMAGE_MODEL,
+                prompt=prompt,
+                size="1024x1024",
+                quality="standard",
+                n=1,
+            )
         )
         
         return response.data[0].url
@@ -39,17 +75,49 @@ async def generate_image(prompt: str) -> str:
         logger.error(f"Image generation error: {str(e)}")
         raise
 
+# Expected size of a generated article, charged to the TPM budget up front
+MARKDOWN_COMPLETION_TOKENS = 1500
+
+def _markdown_messages(prompt: str, locale: str) -> list:
+    return [
+        {"role": "system", "content": f"Generate markdown content in {locale} language. The content should be well-formatted and ready to use."},
+        {"role": "user", "content": prompt}
+    ]
+
 async def generate_markdown_content(prompt: str, locale: str) -> str:
     try:
-        response = await client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": f"Generate markdown content in {locale} language. The content should be well-formatted and ready to use."},
-                {"role": "user", "content": prompt}
-            ]
+        response = await openai_limiter.call(
+            settings.OPENAI_MODEL,
+            lambda: client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=_markdown_messages(prompt, locale)
+            ),
+            tokens=estimate_tokens(prompt, completion_tokens=MARKDOWN_COMPLETION_TOKENS)
         )
         
         return response.choices[0].message.content
     except Exception as e:
         logger.error(f"Content generation error: {str(e)}")
         raise
+
+async def stream_markdown_content(prompt: str, locale: str) -> AsyncIterator[str]:
+    """Yield markdown tokens as the model produces them.
+
+    Closing the generator (e.g. when the client disconnects) closes the
+    upstream HTTP stream, so the generation stops being billed.
+    """
+    # Retrying only makes sense before any token was sent, so the slot is held
+    # for the whole stream and the request is not retried
+    async with openai_limiter.acquire(
+        settings.OPENAI_MODEL,
+        estimate_tokens(prompt, completion_tokens=MARKDOWN_COMPLETION_TOKENS)
+    ):
+        stream = await client.chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            messages=_markdown_messages(prompt, locale),
+            stream=True
+        )
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
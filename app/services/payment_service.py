@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from app.services import subscription_service
 import stripe
 from app.core.config import settings
+from app.core.principals import invalidate_principal
 import logging
 from sqlalchemy import select
 from app.models.tier import Tier
@@ -40,7 +41,7 @@ async def handle_successful_payment(
         db.add(payment)
 
         # Get the tier
-        tier_result = db.execute(
+        tier_result = await db.execute(
             select(Tier).where(Tier.id == tier_id)
         )
         tier = tier_result.scalar_one_or_none()
@@ -49,7 +50,7 @@ async def handle_successful_payment(
             raise ValueError("Tier not found")
 
         # Get the user
-        user_result = db.execute(
+        user_result = await db.execute(
             select(User).where(User.clerk_id == clerk_id)
         )
         user = user_result.scalar_one_or_none()
@@ -62,7 +63,7 @@ async def handle_successful_payment(
         user.api_calls_count = 0
 
         # Delete any existing subscription
-        old_sub_result = db.execute(
+        old_sub_result = await db.execute(
             select(UserSubscription).where(UserSubscription.user_id == clerk_id)
         )
         old_subscription = old_sub_result.scalar_one_or_none()
@@ -81,10 +82,11 @@ async def handle_successful_payment(
         )
         db.add(subscription)
 
-        db.commit()
+        await db.commit()
+        invalidate_principal(clerk_id)
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Failed to process payment: {str(e)}")
         raise HTTPException(
             status_code=500,
@@ -100,10 +102,10 @@ async def cancel_subscription(db: AsyncSession, subscription: UserSubscription)
             await cancel_stripe_subscription(subscription.stripe_subscription_id)
         
         # Delete the subscription from our database
-        db.delete(subscription)
-        db.commit()
+        await db.delete(subscription)
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Failed to cancel subscription: {str(e)}")
         import traceback
         logger.error(f"Stack trace: {traceback.format_exc()}")
@@ -122,7 +124,7 @@ async def create_stripe_checkout_session(
     """Create a Stripe checkout session for subscription"""
     try:
         # Get the tier to check its type
-        tier_result = db.execute(select(Tier).where(Tier.id == tier_id))
+        tier_result = await db.execute(select(Tier).where(Tier.id == tier_id))
         tier = tier_result.scalar_one_or_none()
         
         if not tier:
@@ -351,7 +353,7 @@ async def get_revenue_stats(db: AsyncSession, time_range: str) -> Dict[str, Any]
             Payment.currency
         ).order_by('date')
 
-        result = db.execute(query)
+        result = await db.execute(query)
         payments = result.fetchall()
 
         # Group by currency
@@ -386,7 +388,7 @@ async def get_total_revenue(db: AsyncSession) -> Dict[str, Any]:
             Payment.status == PaymentStatus.COMPLETED
         ).group_by(Payment.currency)
         
-        result = db.execute(query)
+        result = await db.execute(query)
         totals = result.fetchall()
         
         revenue_by_currency = {}
@@ -1,37 +1,48 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 from app.models.product import Product
 from app.schemas.product import ProductCreate, ProductUpdate
 from fastapi import HTTPException
 
-async def create_product(db: Session, product_data: ProductCreate):
+async def create_product(db: AsyncSession, product_data: ProductCreate):
     product = Product(**product_data.model_dump())
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
     return product
 
-async def get_all_products(db: Session):
-    return db.query(Product).all()
+async def get_all_products(db: AsyncSession):
+    result = await db.execute(select(Product))
+    return result.scalars().all()
 
-async def update_product(db: Session, product_id: int, product_data: ProductUpdate):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def get_products_version(db: AsyncSession):
+    """Cheap validator for the product listing: count, max id and max updated_at"""
+    result = await db.execute(select(
+        func.count(Product.id),
+        func.max(Product.id),
+        func.max(Product.updated_at)
+    ))
+    return tuple(result.one())
+
+async def update_product(db: AsyncSession, product_id: int, product_data: ProductUpdate):
+    product = await db.get(Product, product_id)
     if product:
         for key, value in product_data.model_dump().items():
             setattr(product, key, value)
-        db.commit()
-        db.refresh(product)
+        await db.commit()
+        await db.refresh(product)
     return product
 
-async def delete_product(db: Session, product_id: int):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def delete_product(db: AsyncSession, product_id: int):
+    product = await db.get(Product, product_id)
     if product:
-        db.delete(product)
-        db.commit()
+        await db.delete(product)
+        await db.commit()
     return product
 
-async def get_product(db: Session, product_id: int) -> Product:
+async def get_product(db: AsyncSession, product_id: int) -> Product:
     """Get a specific product by ID"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
\ No newline at end of file
+    return product
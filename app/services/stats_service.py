@@ -33,7 +33,7 @@ async def get_user_stats(db: AsyncSession, time_range: str) -> Dict[str, Any]:
             User.first_connection.between(start_date, end_date)
         ).group_by('date').order_by('date')
 
-        result = db.execute(query)
+        result = await db.execute(query)
         users = result.fetchall()
 
         return {
@@ -73,7 +73,7 @@ async def get_revenue_stats(db: AsyncSession, time_range: str):
             Payment.status == PaymentStatus.COMPLETED  # Only include completed payments
         ).group_by('date', Payment.currency).order_by('date')
 
-        result = db.execute(query)
+        result = await db.execute(query)
         payments = result.fetchall()
         
         # Group by status instead of currency
@@ -96,6 +96,7 @@ async def get_revenue_stats(db: AsyncSession, time_range: str):
             detail=f"Failed to get revenue statistics: {str(e)}"
         )
 
-async def get_total_revenue(db):
-    result = db.query(func.sum(Payment.amount)).scalar()
-    return float(result / 100) if result else 0.0
\ No newline at end of file
+async def get_total_revenue(db: AsyncSession):
+    result = await db.execute(select(func.sum(Payment.amount)))
+    total = result.scalar()
+    return float(total / 100) if total else 0.0
\ No newline at end of file
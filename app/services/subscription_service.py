@@ -10,6 +10,7 @@ import logging
 from app.schemas.subscription import UserSubscriptionResponse
 from app.models.user import User
 from app.services import payment_service
+from app.core.principals import invalidate_principal
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,7 @@ async def get_active_subscription(db: AsyncSession, clerk_id: str) -> Optional[U
         .where(UserSubscription.user_id == user_id)
     )
     
-    result = db.execute(query)
+    result = await db.execute(query)
     return result.unique().scalar_one_or_none()
 
 async def register_free_tier(db: AsyncSession, clerk_id: str) -> UserSubscriptionResponse:
@@ -39,7 +40,7 @@ async def register_free_tier(db: AsyncSession, clerk_id: str) -> UserSubscriptio
 
     # Get free tier
     query = select(Tier).where(Tier.is_free == True)
-    result = db.execute(query)
+    result = await db.execute(query)
     free_tier = result.scalar_one_or_none()
     
     if not free_tier:
@@ -47,7 +48,7 @@ async def register_free_tier(db: AsyncSession, clerk_id: str) -> UserSubscriptio
 
     # Get user
     user_query = select(User).where(User.clerk_id == user_id)
-    user_result = db.execute(user_query)
+    user_result = await db.execute(user_query)
     user = user_result.scalar_one_or_none()
     
     if not user:
@@ -69,9 +70,12 @@ async def register_free_tier(db: AsyncSession, clerk_id: str) -> UserSubscriptio
     )
     
     db.add(subscription)
-    db.commit()
-    db.refresh(subscription)
+    await db.commit()
+    await db.refresh(subscription)
+    invalidate_principal(user_id)
     
+    # Reload through the eager-loading query so tier.products is available
+    subscription = await get_active_subscription(db, user_id)
     return UserSubscriptionResponse.model_validate(subscription)
 
 async def get_active_subscription_response(db: AsyncSession, clerk_id: str) -> Optional[UserSubscriptionResponse]:
@@ -79,8 +83,6 @@ async def get_active_subscription_response(db: AsyncSession, clerk_id: str) -> O
     subscription = await get_active_subscription(db, clerk_id)
     if subscription:
         # Ensure relationships are loaded
-        db.refresh(subscription)
-        if subscription.tier:
-            db.refresh(subscription.tier, ['products'])
+        await db.refresh(subscription)
         return UserSubscriptionResponse.model_validate(subscription)
     return None
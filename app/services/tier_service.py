@@ -1,5 +1,7 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update, func
 from app.models.tier import Tier
 from app.schemas.tier import TierCreate, TierUpdate
 from app.models.product import Product
@@ -32,12 +34,16 @@ async def update_stripe_product_description(stripe_price_id: str, description: s
         logger.error(f"Failed to update Stripe product description: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
-async def create_tier(db: Session, tier_data: TierCreate):
+def _tier_query():
+    return select(Tier).options(selectinload(Tier.products))
+
+async def create_tier(db: AsyncSession, tier_data: TierCreate):
     logger.info(f"Creating tier with data: {tier_data.model_dump()}")
     
     if tier_data.is_free:
         logger.info("Processing free tier creation")
-        existing_free_tier = db.query(Tier).filter(Tier.is_free == True).first()
+        result = await db.execute(select(Tier).where(Tier.is_free == True))
+        existing_free_tier = result.scalars().first()
         if existing_free_tier:
             raise HTTPException(status_code=400, detail="A free tier already exists")
         
@@ -47,22 +53,23 @@ async def create_tier(db: Session, tier_data: TierCreate):
     
     if tier_data.popular:
         # Reset popular flag for all other tiers
-        db.query(Tier).filter(Tier.popular == True).update({"popular": False})
+        await db.execute(update(Tier).where(Tier.popular == True).values(popular=False))
     
     # Extract product_ids before creating the tier
     product_ids = tier_data.product_ids
     tier_dict = tier_data.model_dump(exclude={'product_ids'})
     
-    # Create tier without products first
-    tier = Tier(**tier_dict)
+    # Load products up front so the collection never has to lazy load
+    products = []
+    if product_ids:
+        result = await db.execute(select(Product).where(Product.id.in_(product_ids)))
+        products = result.scalars().all()
+    
+    tier = Tier(**tier_dict, products=list(products))
     db.add(tier)
-    db.flush()  # Get the ID without committing
+    await db.flush()  # Get the ID without committing
     
-    # Add products to the tier
-    if product_ids:
-        products = db.query(Product).filter(Product.id.in_(product_ids)).all()
-        tier.products.extend(products)
-        
+    if products:
         # Update Stripe product description if it's a paid tier
         if tier.stripe_price_id:
             await update_stripe_product_description(
@@ -71,22 +78,39 @@ async def create_tier(db: Session, tier_data: TierCreate):
                 products
             )
     
-    db.commit()
-    db.refresh(tier)
+    await db.commit()
+    await db.refresh(tier, ["products"])
     return tier
 
-async def get_all_tiers(db: Session):
-    return db.query(Tier).all()
+async def get_all_tiers(db: AsyncSession):
+    result = await db.execute(_tier_query())
+    return result.scalars().all()
+
+async def get_tiers_version(db: AsyncSession):
+    """Cheap validator for the tier listing, which embeds products: counts, max ids and max updated_at"""
+    def version(model):
+        return [
+            select(func.count(model.id)).scalar_subquery(),
+            select(func.max(model.id)).scalar_subquery(),
+            select(func.max(model.updated_at)).scalar_subquery()
+        ]
+    result = await db.execute(select(*version(Tier), *version(Product)))
+    return tuple(result.one())
 
-async def get_tier(db: Session, tier_id: int):
-    return db.query(Tier).filter(Tier.id == tier_id).first()
+async def get_tier(db: AsyncSession, tier_id: int):
+    result = await db.execute(_tier_query().where(Tier.id == tier_id))
+    return result.scalar_one_or_none()
 
-async def update_tier(db: Session, tier_id: int, tier_data: TierUpdate):
-    tier = db.query(Tier).filter(Tier.id == tier_id).first()
+async def update_tier(db: AsyncSession, tier_id: int, tier_data: TierUpdate):
+    tier = await get_tier(db, tier_id)
     if tier:
         if tier_data.popular:
             # Reset popular flag for all other tiers
-            db.query(Tier).filter(Tier.id != tier_id).filter(Tier.popular == True).update({"popular": False})
+            await db.execute(
+                update(Tier)
+                .where(Tier.id != tier_id, Tier.popular == True)
+                .values(popular=False)
+            )
         
         # Extract product_ids before updating the tier
         product_ids = tier_data.product_ids
@@ -98,8 +122,11 @@ async def update_tier(db: Session, tier_id: int, tier_data: TierUpdate):
         
         # Update products if provided
         if product_ids is not None:
-            products = db.query(Product).filter(Product.id.in_(product_ids)).all()
-            tier.products = products
+            result = await db.execute(select(Product).where(Product.id.in_(product_ids)))
+            products = result.scalars().all()
+            tier.products = list(products)
+            # Collection changes don't touch the tier row, bump it for cache validators
+            tier.updated_at = func.now()
             
             # Update Stripe product description if it's a paid tier
             if tier.stripe_price_id:
@@ -109,14 +136,15 @@ async def update_tier(db: Session, tier_id: int, tier_data: TierUpdate):
                     products
                 )
         
-        db.commit()
-        db.refresh(tier)
+        await db.commit()
+        await db.refresh(tier)
     return tier
 
-async def delete_tier(db: Session, tier: Tier):
-    db.delete(tier)
-    db.commit()
+async def delete_tier(db: AsyncSession, tier: Tier):
+    await db.delete(tier)
+    await db.commit()
     return tier
 
-async def get_default_tier(db: Session):
-    return db.query(Tier).filter(Tier.is_free == True).first() 
\ No newline at end of file
+async def get_default_tier(db: AsyncSession):
+    result = await db.execute(select(Tier).where(Tier.is_free == True))
+    return result.scalars().first()
@@ -0,0 +1,101 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from openai import AsyncOpenAI
+from app.core.config import settings
+from app.models.translation_memory import TranslationMemory
+from app.services import openai_service
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import copy
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keys holding identifiers rather than prose (e.g. HomeContent feature icons)
+UNTRANSLATABLE_KEYS = {"icon"}
+
+# Segments sent to the model per request
+SEGMENTS_PER_REQUEST = 50
+
+Path = Tuple[Any, ...]
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _iter_leaves(value: Any, path: Path = ()) -> Iterator[Tuple[Path, str]]:
+    """Translatable string leaves of a JSON-like structure, with their paths"""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if key not in UNTRANSLATABLE_KEYS:
+                yield from _iter_leaves(child, path + (key,))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            yield from _iter_leaves(child, path + (index,))
+    elif isinstance(value, str) and value.strip():
+        yield path, value
+
+def _set_leaf(value: Any, path: Path, leaf: str) -> None:
+    for step in path[:-1]:
+        value = value[step]
+    value[path[-1]] = leaf
+
+async def _lookup(db: AsyncSession, texts: List[str], target_locale: str, model: str) -> Dict[str, str]:
+    hashes = {source_hash(text): text for text in texts}
+    result = await db.execute(
+        select(TranslationMemory.source_hash, TranslationMemory.translated_text).where(
+            TranslationMemory.source_hash.in_(hashes),
+            TranslationMemory.target_locale == target_locale,
+            TranslationMemory.model == model
+        )
+    )
+    return {hashes[row.source_hash]: row.translated_text for row in result}
+
+async def _remember(db: AsyncSession, translations: Dict[str, str], target_locale: str, model: str) -> None:
+    rows = [
+        {
+            "source_hash": source_hash(text),
+            "target_locale": target_locale,
+            "model": model,
+            "source_text": text,
+            "translated_text": translated
+        }
+        for text, translated in translations.items()
+    ]
+    await db.execute(insert(TranslationMemory).values(rows).on_conflict_do_nothing(
+        index_elements=["source_hash", "target_locale", "model"]
+    ))
+    await db.commit()
+
+async def translate_content(
+    db: AsyncSession,
+    content: dict,
+    target_locale: str,
+    openai_client: Optional[AsyncOpenAI] = None
+) -> dict:
+    """Translate every string leaf of content, only sending segments the memory has not seen"""
+    model = settings.OPENAI_MODEL
+    leaves = list(_iter_leaves(content))
+    texts = list(dict.fromkeys(text for _, text in leaves))
+
+    known = await _lookup(db, texts, target_locale, model) if texts else {}
+    # Release the connection while the model works
+    await db.commit()
+
+    missing = [text for text in texts if text not in known]
+    logger.info(f"Translating to {target_locale}: {len(texts) - len(missing)} segments from memory, {len(missing)} new")
+    for start in range(0, len(missing), SEGMENTS_PER_REQUEST):
+        chunk = missing[start:start + SEGMENTS_PER_REQUEST]
+        translated = await openai_service.translate_segments(
+            {str(index): text for index, text in enumerate(chunk)},
+            target_locale,
+            openai_client
+        )
+        new_translations = {text: translated[str(index)] for index, text in enumerate(chunk)}
+        await _remember(db, new_translations, target_locale, model)
+        known.update(new_translations)
+
+    translated_content = copy.deepcopy(content)
+    for path, text in leaves:
+        _set_leaf(translated_content, path, known[text])
+    return translated_content
@@ -1,15 +1,15 @@
 import logging
-from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserDetailsResponse
 import httpx
 from app.core.config import settings
-from sqlalchemy.orm import joinedload
+from app.core.principals import invalidate_principal
+from sqlalchemy.orm import joinedload, selectinload
 from app.models.tier import Tier
 from typing import Optional
 from fastapi import HTTPException
 from app.models.user_subscription import UserSubscription
-from sqlalchemy import select
+from sqlalchemy import select, func
 from app.services.subscription_service import get_active_subscription, get_active_subscription_response
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -39,7 +39,7 @@ async def get_clerk_user_data(clerk_id: str):
         logger.error(f"HTTP request to Clerk API failed: {str(e)}")
         return None
 
-async def create_user(db: Session, user: UserCreate):
+async def create_user(db: AsyncSession, user: UserCreate):
     user_data = user.model_dump()
     # Remove subscribed_tiers from the data if it exists
     user_data.pop('subscribed_tiers', None)
@@ -50,21 +50,22 @@ async def create_user(db: Session, user: UserCreate):
     
     db_user = User(**user_data)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await db.refresh(db_user, ["subscribed_tiers"])
     return db_user
 
-async def get_all_users(db: Session):
-    users = (
-        db.query(User)
+async def get_all_users(db: AsyncSession):
+    result = await db.execute(
+        select(User)
         .options(
             joinedload(User.subscribed_tiers),
             joinedload(User.subscriptions)
             .joinedload(UserSubscription.tier)
             .joinedload(Tier.products)
         )
-        .all()
     )
+    users = result.unique().scalars().all()
     
     # Add active subscription tier to each user
     for user in users:
@@ -73,13 +74,14 @@ async def get_all_users(db: Session):
     
     return users
 
-async def update_user(db: Session, db_user: User, user_update: UserUpdate):
+async def update_user(db: AsyncSession, db_user: User, user_update: UserUpdate):
     update_data = user_update.model_dump(exclude_unset=True)
     
     # Handle tier update separately
     if 'tier' in update_data:
         tier_name = update_data.pop('tier')
-        tier = db.query(Tier).filter(Tier.name == tier_name).first()
+        result = await db.execute(select(Tier).where(Tier.name == tier_name))
+        tier = result.scalars().first()
         if tier:
             logger.info(f"Setting tier to {tier_name} for user {db_user.id} {tier}")
             db_user.subscribed_tiers = [tier]
@@ -91,26 +93,31 @@ async def update_user(db: Session, db_user: User, user_update: UserUpdate):
     for key, value in update_data.items():
         setattr(db_user, key, value)
     
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    invalidate_principal(db_user.clerk_id)
     return db_user
 
-async def delete_user(db: Session, db_user: User):
-    db.delete(db_user)
-    db.commit()
+async def delete_user(db: AsyncSession, db_user: User):
+    await db.delete(db_user)
+    await db.commit()
+    invalidate_principal(db_user.clerk_id)
     return db_user
 
-async def get_user_by_clerk_id(db: Session, clerk_id: str):
+async def get_user_by_clerk_id(db: AsyncSession, clerk_id: str):
     """Get a user by their Clerk ID"""
-    return db.query(User).options(
-        joinedload(User.subscribed_tiers)
-    ).filter(User.clerk_id == clerk_id).first()
+    result = await db.execute(
+        select(User)
+        .options(selectinload(User.subscribed_tiers))
+        .where(User.clerk_id == clerk_id)
+    )
+    return result.scalar_one_or_none()
 
 
-async def is_first_user(db: Session) -> bool:
+async def is_first_user(db: AsyncSession) -> bool:
     """Check if this is the first user being registered"""
-    user_count = db.query(User).count()
-    return user_count == 0
+    result = await db.execute(select(func.count(User.id)))
+    return result.scalar_one() == 0
 
 async def get_user_details(db: AsyncSession, clerk_id: str) -> Optional[UserDetailsResponse]:
     """Get detailed user information including active subscription and tier"""
@@ -119,7 +126,7 @@ async def get_user_details(db: AsyncSession, clerk_id: str) -> Optional[UserDeta
         .options(joinedload(User.subscriptions))
         .where(User.clerk_id == clerk_id)
     )
-    result = db.execute(query)
+    result = await db.execute(query)
     user = result.unique().scalar_one_or_none()
     
     if not user:
@@ -144,7 +151,7 @@ async def get_user_details(db: AsyncSession, clerk_id: str) -> Optional[UserDeta
     
     return UserDetailsResponse.model_validate(user_details)
 
-async def get_user(db: Session, user_id: int) -> Optional[User]:
+async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
     """
     Retrieve a user by their ID.
     
@@ -156,7 +163,12 @@ async def get_user(db: Session, user_id: int) -> Optional[User]:
         Optional[User]: The user if found, None otherwise
     """
     try:
-        return db.query(User).filter(User.id == user_id).first()
+        result = await db.execute(
+            select(User)
+            .options(selectinload(User.subscribed_tiers))
+            .where(User.id == user_id)
+        )
+        return result.scalar_one_or_none()
     except Exception as e:
         logger.error(f"Error retrieving user {user_id}: {str(e)}")
         raise HTTPException(
@@ -0,0 +1,84 @@
+"""Stand-in for the OpenAI HTTP API, served to AsyncOpenAI through httpx.MockTransport"""
+import asyncio
+import json
+from typing import List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+class FakeStream(httpx.AsyncByteStream):
+    """Chat completion chunks as Server-Sent Events, recording whether the client closed it"""
+
+    def __init__(self, tokens: List[str], delay: float = 0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.sent = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        for token in self.tokens:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            self.sent += 1
+            chunk = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "test-model",
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+class FakeOpenAI:
+    """Answers each request with the next scripted reply.
+
+    Replies are ("completion", text), ("stream", [tokens]) or
+    ("error", status, {headers}, error_code). The text of a completion can
+    also be a function of the request body. Once the script is exhausted
+    every request gets a completion.
+    """
+
+    def __init__(self, *script, stream_delay: float = 0.0):
+        self.script = list(script)
+        self.stream_delay = stream_delay
+        self.requests: List[dict] = []
+        self.streams: List[FakeStream] = []
+        self.transport = httpx.MockTransport(self.handle)
+
+    def client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key="test",
+            base_url="https://openai.test/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=self.transport),
+        )
+
+    @property
+    def stream(self) -> Optional[FakeStream]:
+        return self.streams[-1] if self.streams else None
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content or b"{}")
+        self.requests.append(body)
+        reply = self.script.pop(0) if self.script else ("completion", "# Hello")
+        kind = reply[0]
+        if kind == "error":
+            _, status, headers, code = reply
+            return httpx.Response(status, headers=headers, json={
+                "error": {"message": "scripted failure", "type": code, "code": code}
+            })
+        if kind == "stream":
+            stream = FakeStream(reply[1], delay=self.stream_delay)
+            self.streams.append(stream)
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=stream)
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test-model",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": reply[1](body) if callable(reply[1]) else reply[1]}}],
+        })
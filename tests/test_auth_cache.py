@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core import auth, cache
+
+@pytest.fixture
+def signing_key(monkeypatch):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = jwt.PyJWK.from_dict({
+        **jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True),
+        "kid": "test",
+        "alg": "RS256",
+    })
+    lookups = []
+
+    async def get_signing_key_from_jwt(token):
+        lookups.append(token)
+        return public_jwk
+
+    monkeypatch.setattr(auth.jwks_manager, "get_signing_key_from_jwt", get_signing_key_from_jwt)
+    monkeypatch.setattr(auth.settings, "CLERK_JWT_AUDIENCE", "")
+    monkeypatch.setattr(auth.settings, "CLERK_JWT_ISSUER", "https://clerk.test")
+    auth.token_cache.clear()
+    yield private_key, lookups
+    auth.token_cache.clear()
+
+def _credentials(private_key, **claims) -> HTTPAuthorizationCredentials:
+    payload = {"sub": "user_1", "azp": "app", "iss": "https://clerk.test", "exp": int(time.time()) + 600}
+    payload.update(claims)
+    token = jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": "test"})
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+def test_cache_hit_skips_jwt_decode(signing_key, monkeypatch):
+    private_key, lookups = signing_key
+    credentials = _credentials(private_key)
+    decodes = []
+    real_decode = auth.decode_and_verify_token
+
+    def counting_decode(token, key):
+        decodes.append(token)
+        return real_decode(token, key)
+
+    monkeypatch.setattr(auth, "decode_and_verify_token", counting_decode)
+    hits_before = auth.token_cache.hits
+
+    first = asyncio.run(auth.get_current_user_from_token(credentials))
+    for _ in range(5):
+        assert asyncio.run(auth.get_current_user_from_token(credentials)) == first
+
+    assert first["sub"] == "user_1"
+    assert len(decodes) == 1
+    assert len(lookups) == 1
+    assert auth.token_cache.hits - hits_before == 5
+
+def test_expired_token_is_rejected_and_not_cached(signing_key):
+    private_key, _ = signing_key
+    credentials = _credentials(private_key, exp=int(time.time()) - 10)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(auth.get_current_user_from_token(credentials))
+
+    assert excinfo.value.status_code == 401
+    assert len(auth.token_cache) == 0
+
+def test_cache_ttl_is_capped_by_exp(signing_key, monkeypatch):
+    private_key, _ = signing_key
+    credentials = _credentials(private_key, exp=int(time.time()) + 2)
+    ttls = []
+    monkeypatch.setattr(auth.token_cache, "set", lambda key, value, ttl=None: ttls.append(ttl))
+
+    asyncio.run(auth.get_current_user_from_token(credentials))
+
+    assert len(ttls) == 1 and 0 < ttls[0] <= 2
+
+def test_cache_entry_expires_with_token(signing_key, monkeypatch):
+    private_key, _ = signing_key
+    credentials = _credentials(private_key, exp=int(time.time()) + 2)
+    decodes = []
+    real_decode = auth.decode_and_verify_token
+
+    def counting_decode(token, key):
+        decodes.append(token)
+        return real_decode(token, key)
+
+    monkeypatch.setattr(auth, "decode_and_verify_token", counting_decode)
+    asyncio.run(auth.get_current_user_from_token(credentials))
+    asyncio.run(auth.get_current_user_from_token(credentials))
+    assert len(decodes) == 1
+
+    # Past the token's exp the entry is gone and the token is verified again
+    now = time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 3)
+    asyncio.run(auth.get_current_user_from_token(credentials))
+
+    assert len(decodes) == 2
@@ -0,0 +1,115 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.core import invalidation
+from app.core.invalidation import InvalidationBus, RedisInvalidationBus
+
+CHANNEL = "test-invalidation"
+
+def test_local_bus_dispatches_by_prefix():
+    bus = InvalidationBus()
+    received = []
+    bus.subscribe("principal", lambda suffix: received.append(("principal", suffix)))
+    bus.subscribe("content", lambda suffix: received.append(("content", suffix)))
+
+    bus.publish("principal:user_1")
+    bus.publish("content:home:en")
+    bus.publish("blog:3")
+
+    assert received == [("principal", "user_1"), ("content", "home:en")]
+    assert bus.stats()["published"] == 3
+
+def test_local_bus_survives_failing_handler():
+    bus = InvalidationBus()
+    received = []
+
+    def broken(suffix):
+        raise RuntimeError("boom")
+
+    bus.subscribe("blog", broken)
+    bus.subscribe("blog", received.append)
+
+    bus.publish("blog:7")
+
+    assert received == ["7"]
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        invalidation.aioredis.Redis, "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(server=server)
+    )
+    monkeypatch.setattr(
+        invalidation.redis.Redis, "from_url",
+        lambda url, **kwargs: fakeredis.FakeRedis(server=server)
+    )
+    return server
+
+async def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("timed out waiting for the invalidation")
+        await asyncio.sleep(0.01)
+
+def test_redis_bus_fans_out_to_other_workers(redis_server):
+    async def run():
+        workers = [RedisInvalidationBus("redis://fake", CHANNEL) for _ in range(3)]
+        received = {bus.origin: [] for bus in workers}
+        for bus in workers:
+            bus.subscribe("principal", received[bus.origin].append)
+            await bus.start()
+        try:
+            # Let every subscriber attach before publishing
+            await asyncio.sleep(0.1)
+            workers[0].publish("principal:user_1")
+            await _wait_for(lambda: all(received[bus.origin] for bus in workers))
+            await asyncio.sleep(0.1)
+        finally:
+            for bus in workers:
+                await bus.stop()
+        return workers, received
+
+    workers, received = asyncio.run(run())
+    # The publisher applies the key once locally and ignores its own echo
+    assert all(keys == ["user_1"] for keys in received.values())
+    assert workers[0].received == 0
+    assert workers[1].received == workers[2].received == 1
+
+def test_redis_bus_publishes_synchronously_outside_its_loop(redis_server):
+    # Celery tasks and scripts publish without the API event loop running
+    async def run():
+        listener = RedisInvalidationBus("redis://fake", CHANNEL)
+        received = []
+        listener.subscribe("content", received.append)
+        await listener.start()
+        try:
+            await asyncio.sleep(0.1)
+            await asyncio.to_thread(RedisInvalidationBus("redis://fake", CHANNEL).publish, "content:home:fr")
+            await _wait_for(lambda: received)
+        finally:
+            await listener.stop()
+        return received
+
+    assert asyncio.run(run()) == ["home:fr"]
+
+def test_redis_bus_ignores_malformed_messages(redis_server):
+    bus = RedisInvalidationBus("redis://fake", CHANNEL)
+    received = []
+    bus.subscribe("blog", received.append)
+
+    bus._handle(b"not json")
+    bus._handle(b'{"origin": "other"}')
+    bus._handle(b'{"origin": "other", "key": "blog:9"}')
+
+    assert received == ["9"]
+    assert bus.received == 1
+
+def test_create_invalidation_bus_uses_redis_when_configured(monkeypatch):
+    monkeypatch.setattr(invalidation.settings, "INVALIDATION_REDIS_URL", "")
+    assert type(invalidation.create_invalidation_bus()) is InvalidationBus
+    monkeypatch.setattr(invalidation.settings, "INVALIDATION_REDIS_URL", "redis://redis:6379/1")
+    assert isinstance(invalidation.create_invalidation_bus(), RedisInvalidationBus)
@@ -0,0 +1,135 @@
+import asyncio
+import types
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.exceptions import PyJWKClientError
+
+from app.core import jwks
+
+JWKS_URL = "https://clerk.test/.well-known/jwks.json"
+
+def _jwk(kid: str) -> dict:
+    public_key = rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key()
+    return {**jwt.algorithms.RSAAlgorithm.to_jwk(public_key, as_dict=True), "kid": kid, "use": "sig", "alg": "RS256"}
+
+class FakeClerk:
+    """Stand-in JWKS endpoint served through httpx.MockTransport"""
+
+    def __init__(self, *kids: str):
+        self.keys = [_jwk(kid) for kid in kids]
+        self.requests = 0
+        self.down = False
+        self.delay = 0.0
+        self.transport = httpx.MockTransport(self.handle)
+
+    def rotate(self, *kids: str) -> None:
+        self.keys = [_jwk(kid) for kid in kids]
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.down:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"keys": self.keys}, headers={"Cache-Control": "public, max-age=600"})
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(jwks, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def _manager(clerk: FakeClerk) -> jwks.JWKSManager:
+    return jwks.JWKSManager(JWKS_URL, refresh_interval=3600, min_refresh_interval=30, transport=clerk.transport)
+
+def test_rotation_loads_new_kid(clock):
+    clerk = FakeClerk("key-1")
+    manager = _manager(clerk)
+
+    async def run():
+        await manager.refresh()
+        assert (await manager.get_signing_key("key-1")).key_id == "key-1"
+
+        clerk.rotate("key-1", "key-2")
+        clock[0] += 31
+        assert (await manager.get_signing_key("key-2")).key_id == "key-2"
+
+    asyncio.run(run())
+    assert clerk.requests == 2
+    assert sorted(manager.kids) == ["key-1", "key-2"]
+
+def test_unknown_kid_refetch_is_rate_limited(clock):
+    clerk = FakeClerk("key-1")
+    manager = _manager(clerk)
+
+    async def run():
+        await manager.refresh()
+        clock[0] += 31
+        for _ in range(5):
+            with pytest.raises(PyJWKClientError):
+                await manager.get_signing_key("bogus")
+
+    asyncio.run(run())
+    assert clerk.requests == 2
+
+def test_concurrent_unknown_kids_share_one_fetch(clock):
+    clerk = FakeClerk("key-1")
+    manager = _manager(clerk)
+
+    async def run():
+        await manager.refresh()
+        clerk.rotate("key-2")
+        clerk.delay = 0.05
+        clock[0] += 31
+        return await asyncio.gather(*(manager.get_signing_key("key-2") for _ in range(20)))
+
+    keys = asyncio.run(run())
+    assert {key.key_id for key in keys} == {"key-2"}
+    assert clerk.requests == 2
+
+def test_outage_is_negatively_cached(clock):
+    clerk = FakeClerk("key-1")
+    manager = _manager(clerk)
+
+    async def run():
+        await manager.refresh()
+        clerk.down = True
+        clock[0] += 31
+
+        with pytest.raises(PyJWKClientError, match="Failed to fetch JWKS"):
+            await manager.get_signing_key("key-2")
+        # Within the interval after a failure, unknown kids fail without a request
+        for _ in range(10):
+            with pytest.raises(PyJWKClientError, match="Unable to find"):
+                await manager.get_signing_key("key-2")
+        assert clerk.requests == 2
+
+        # Known keys keep working through the outage
+        assert (await manager.get_signing_key("key-1")).key_id == "key-1"
+
+        clerk.down = False
+        clerk.rotate("key-1", "key-2")
+        clock[0] += 31
+        assert (await manager.get_signing_key("key-2")).key_id == "key-2"
+
+    asyncio.run(run())
+    assert clerk.requests == 3
+
+def test_start_survives_unreachable_endpoint(clock):
+    clerk = FakeClerk("key-1")
+    clerk.down = True
+    manager = _manager(clerk)
+
+    async def run():
+        await manager.start()
+        try:
+            with pytest.raises(PyJWKClientError, match="Unable to find"):
+                await manager.get_signing_key("key-1")
+        finally:
+            await manager.stop()
+
+    asyncio.run(run())
+    assert clerk.requests == 1
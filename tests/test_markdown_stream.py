@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import admin_required
+from app.api.v1.endpoints import content
+from app.core.rate_limit import openai_limiter
+from app.core.config import settings
+from app.services import openai_service
+from fake_openai import FakeOpenAI
+
+def _events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    def install(*script, stream_delay: float = 0.0) -> FakeOpenAI:
+        fake = FakeOpenAI(*script, stream_delay=stream_delay)
+        monkeypatch.setattr(openai_service, "client", fake.client())
+        return fake
+    return install
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(content.router, prefix="/content")
+    app.dependency_overrides[admin_required] = lambda: None
+    with TestClient(app) as client:
+        yield client
+
+def test_stream_sends_ttft_tokens_and_done(fake_openai, client):
+    fake = fake_openai(("stream", ["# Title", "\n\nBody", " text"]))
+
+    with client.stream("POST", "/content/generate-markdown/stream", json={"prompt": "p", "locale": "fr"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _events(response.read().decode())
+
+    assert [name for name, _ in events] == ["ttft", "token", "token", "token", "done"]
+    assert "".join(data["content"] for name, data in events if name == "token") == "# Title\n\nBody text"
+    assert events[-1][1]["tokens"] == 3
+    assert fake.requests[0]["stream"] is True
+    assert "fr" in fake.requests[0]["messages"][0]["content"]
+    assert fake.stream.closed
+
+def test_stream_reports_upstream_failure_as_event(fake_openai, client):
+    fake_openai(("error", 400, {}, "invalid_request_error"))
+
+    with client.stream("POST", "/content/generate-markdown/stream", json={"prompt": "p"}) as response:
+        events = _events(response.read().decode())
+
+    assert events == [("error", {"detail": "Failed to generate markdown content"})]
+
+class _Request:
+    """Request stand-in whose client goes away after a number of checks"""
+
+    def __init__(self, connected_checks: int):
+        self.connected_checks = connected_checks
+
+    async def is_disconnected(self) -> bool:
+        self.connected_checks -= 1
+        return self.connected_checks < 0
+
+def test_disconnect_closes_upstream_stream(fake_openai):
+    fake = fake_openai(("stream", [f"tok{i} " for i in range(50)]), stream_delay=0.01)
+
+    async def run():
+        response = await content.stream_markdown(_Request(connected_checks=2), prompt="p", locale="en")
+        events = [event async for event in response.body_iterator]
+        # The upstream is closed when the handler stops, not whenever the generator is collected
+        assert fake.stream.closed
+        return events
+
+    events = asyncio.run(run())
+    assert len(events) == 3  # ttft and two tokens
+    assert fake.stream.sent < 50
+    assert openai_limiter.metrics[settings.OPENAI_MODEL].in_flight == 0
@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+import app.db.base  # noqa: F401, registers every model for the mappers
+from app.api.v1.endpoints import media
+from app.core.storage import LocalStorage
+from app.services import media_library_service
+
+NAME = "7c00fac6abf7a9a84c23ab5ba5aa6ea738540c83acdeed28c380a9b6b0b7a5ba.png"
+
+class RecordingSession:
+    """Stands in for AsyncSession, returning a fixed row for every query"""
+
+    def __init__(self, row=None):
+        self.row = row
+        self.queries = []
+
+    async def execute(self, query):
+        self.queries.append(query)
+        return SimpleNamespace(scalar_one_or_none=lambda: self.row)
+
+def test_find_by_name_checks_every_directory_of_the_file_type():
+    db = RecordingSession()
+
+    asyncio.run(media_library_service.find_by_name(db, "image", NAME))
+
+    params = db.queries[0].compile(dialect=postgresql.dialect()).params
+    paths = next(value for value in params.values() if isinstance(value, list))
+    assert sorted(paths) == [f"image/{NAME}", f"images/{NAME}"]
+
+def test_deleting_an_upload_deduplicated_into_a_generated_image_releases_its_row(tmp_path, monkeypatch):
+    # An upload of the same bytes as a generated image references images/<sha>.png
+    row = SimpleNamespace(path=f"images/{NAME}", file_type="image", filename=NAME)
+    released = []
+
+    async def release_file(db, key, file_type):
+        released.append(key)
+        return 1
+
+    monkeypatch.setattr(media, "storage", LocalStorage(str(tmp_path), "http://testserver/uploads"))
+    monkeypatch.setattr(media_library_service, "release_file", release_file)
+
+    response = asyncio.run(media.delete_file("image", NAME, db=RecordingSession(row)))
+
+    assert released == [f"images/{NAME}"]
+    assert response["remaining_references"] == 1
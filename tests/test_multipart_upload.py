@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.services import media_service
+
+BOUNDARY = "test-boundary"
+
+def _body(content: bytes, filename: str = "doc.pdf", field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="note"\r\n\r\n'
+        f"hello\r\n"
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+class ChunkedRequest:
+    """A request whose body arrives in fixed-size chunks, without Content-Length"""
+
+    def __init__(self, body: bytes, chunk_size: int = 1000, content_type: str = None):
+        self.chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        self.received = 0
+        headers = [(b"content-type", (content_type or f"multipart/form-data; boundary={BOUNDARY}").encode())]
+        self.request = Request({"type": "http", "method": "POST", "headers": headers}, self._receive)
+
+    async def _receive(self):
+        self.received += 1
+        index = self.received - 1
+        return {
+            "type": "http.request",
+            "body": self.chunks[index] if index < len(self.chunks) else b"",
+            "more_body": index < len(self.chunks) - 1,
+        }
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_service.settings, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+def _incoming(upload_dir) -> list:
+    directory = os.path.join(upload_dir, media_service.INCOMING_DIR)
+    return os.listdir(directory) if os.path.isdir(directory) else []
+
+def test_file_part_is_streamed_to_a_temporary_file(upload_dir):
+    content = os.urandom(10_000)
+    chunked = ChunkedRequest(_body(content), chunk_size=777)
+    upload = media_service.MultipartUpload(chunked.request)
+
+    async def receive():
+        filename = await upload.read_headers()
+        # Only the chunks up to the part headers are read to learn the filename
+        assert chunked.received < len(chunked.chunks)
+        return filename, await media_service.receive_upload(upload, "document")
+
+    filename, received = asyncio.run(receive())
+
+    assert filename == "doc.pdf"
+    assert upload.content_type == "application/pdf"
+    assert received.size == len(content)
+    assert received.sha256 == hashlib.sha256(content).hexdigest()
+    with open(received.path, "rb") as f:
+        assert f.read() == content
+
+def test_oversized_chunked_upload_is_rejected_as_it_arrives(upload_dir, monkeypatch):
+    monkeypatch.setitem(media_service.settings.MAX_FILE_SIZE, "document", 5_000)
+    chunked = ChunkedRequest(_body(b"x" * 50_000))
+    upload = media_service.MultipartUpload(chunked.request)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(media_service.receive_upload(upload, "document"))
+
+    assert excinfo.value.detail == media_service.file_too_large("document", 5_000).detail
+    assert chunked.received < len(chunked.chunks) // 2
+    assert _incoming(upload_dir) == []
+
+def test_request_without_the_file_field_is_rejected():
+    upload = media_service.MultipartUpload(ChunkedRequest(_body(b"data", field="attachment")).request)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(upload.read_headers())
+
+    assert excinfo.value.status_code == 400
+
+def test_truncated_body_is_rejected(upload_dir):
+    upload = media_service.MultipartUpload(ChunkedRequest(_body(b"x" * 5_000)[:3_000]).request)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(media_service.receive_upload(upload, "document"))
+
+    assert excinfo.value.detail == "Incomplete multipart body"
+    assert _incoming(upload_dir) == []
+
+def test_non_multipart_request_is_rejected():
+    with pytest.raises(HTTPException) as excinfo:
+        media_service.MultipartUpload(ChunkedRequest(b"{}", content_type="application/json").request)
+
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,117 @@
+import asyncio
+
+import openai
+import pytest
+
+from app.core import rate_limit
+from app.core.rate_limit import OutboundLimiter
+from fake_openai import FakeOpenAI
+
+MODEL = "test-model"
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting them out"""
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *args, **kwargs):
+        recorded.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", sleep)
+    return recorded
+
+def _limiter(**kwargs) -> OutboundLimiter:
+    options = dict(concurrency=4, tokens_per_minute=0, max_retries=3, base_delay=1.0, max_delay=30.0)
+    options.update(kwargs)
+    return OutboundLimiter(**options)
+
+async def _complete(limiter: OutboundLimiter, fake: FakeOpenAI, tokens: int = 0) -> str:
+    client = fake.client()
+    response = await limiter.call(
+        MODEL,
+        lambda: client.chat.completions.create(model=MODEL, messages=[{"role": "user", "content": "hi"}]),
+        tokens=tokens
+    )
+    return response.choices[0].message.content
+
+def test_rate_limited_call_retries_after_requested_delay(sleeps):
+    fake = FakeOpenAI(("error", 429, {"retry-after": "2"}, "rate_limit_exceeded"), ("completion", "ok"))
+    limiter = _limiter()
+
+    assert asyncio.run(_complete(limiter, fake)) == "ok"
+    assert len(fake.requests) == 2
+    assert sleeps == [2.0]
+    assert limiter.metrics[MODEL].rate_limited == 1
+    assert limiter.metrics[MODEL].retries == 1
+
+def test_insufficient_quota_is_not_retried(sleeps):
+    fake = FakeOpenAI(("error", 429, {}, "insufficient_quota"))
+    limiter = _limiter()
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(_complete(limiter, fake))
+    assert len(fake.requests) == 1
+    assert sleeps == []
+    assert limiter.metrics[MODEL].failures == 1
+
+def test_retry_after_beyond_max_delay_fails_fast(sleeps):
+    fake = FakeOpenAI(("error", 429, {"retry-after": "120"}, "rate_limit_exceeded"))
+    limiter = _limiter(max_delay=30.0)
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(_complete(limiter, fake))
+    assert len(fake.requests) == 1
+    assert sleeps == []
+
+def test_backoff_never_exceeds_max_delay():
+    limiter = _limiter(base_delay=1.0, max_delay=5.0)
+    error = openai.APIConnectionError(request=None)
+
+    delays = [limiter.backoff_delay(attempt, error) for attempt in range(20) for _ in range(20)]
+
+    assert all(0 <= delay <= 5.0 for delay in delays)
+
+def test_gives_up_after_max_retries(sleeps):
+    fake = FakeOpenAI(*[("error", 503, {}, "overloaded")] * 3)
+    limiter = _limiter(max_retries=2)
+
+    with pytest.raises(openai.InternalServerError):
+        asyncio.run(_complete(limiter, fake))
+    assert len(fake.requests) == 3
+    assert len(sleeps) == 2
+    assert limiter.metrics[MODEL].failures == 1
+
+def test_retries_do_not_charge_the_token_budget_again(sleeps):
+    fake = FakeOpenAI(("error", 500, {}, "server_error"), ("error", 500, {}, "server_error"), ("completion", "ok"))
+    limiter = _limiter(tokens_per_minute=6000)
+
+    async def run():
+        assert await _complete(limiter, fake, tokens=5000) == "ok"
+        _, bucket = limiter._limits(MODEL)
+        return bucket.tokens
+
+    remaining = asyncio.run(run())
+    assert len(fake.requests) == 3
+    # 6000 - 5000 plus a few milliseconds of refill; a second charge would have left nothing
+    assert 1000 <= remaining < 1100
+
+def test_concurrency_is_limited_per_model():
+    limiter = _limiter(concurrency=2)
+    active = []
+    peak = []
+
+    async def request():
+        async with limiter.acquire(MODEL):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(run())
+    assert max(peak) == 2
+    assert limiter.metrics[MODEL].in_flight == 0
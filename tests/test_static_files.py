@@ -0,0 +1,20 @@
+import pytest
+from starlette.datastructures import Headers
+
+from app.core.static_files import _accepted_encodings
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", set()),
+    ("gzip, deflate, br", {"gzip", "br"}),
+    ("br;q=0.5, GZIP", {"gzip", "br"}),
+    ("gzip;q=0, br", {"br"}),
+    ("gzip;q=0.0, br; q=0", set()),
+    ("gzip; Q=0.000", set()),
+    ("gzip;q=abc", set()),
+    ("*", {"gzip", "br"}),
+    ("*;q=0.1, br;q=0", {"gzip"}),
+    ("gzip, *;q=0", {"gzip"}),
+    ("identity", set()),
+])
+def test_accepted_encodings_honour_quality_values(accept_encoding, expected):
+    assert _accepted_encodings(Headers({"accept-encoding": accept_encoding})) == expected
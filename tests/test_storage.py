@@ -0,0 +1,184 @@
+import asyncio
+import base64
+import gzip
+import hashlib
+import os
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core import storage as storage_module
+from app.core.storage import LocalStorage, S3Storage, StorageBackend, precompress
+from app.services import media_library_service, media_service
+
+BUCKET = "media"
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    """An in-process moto S3 server, shared by the module"""
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+@pytest.fixture
+def s3(s3_endpoint):
+    backend = S3Storage(
+        BUCKET,
+        endpoint_url=s3_endpoint,
+        region="us-east-1",
+        access_key_id="testing",
+        secret_access_key="testing",
+    )
+    backend.client.create_bucket(Bucket=BUCKET)
+    yield backend
+    asyncio.run(backend.delete_prefix("image"))
+    asyncio.run(backend.delete_prefix("document"))
+    backend.client.delete_bucket(Bucket=BUCKET)
+
+def test_incomplete_backend_cannot_be_created():
+    class ReadOnlyStorage(StorageBackend):
+        def url(self, key: str) -> str:
+            return key
+
+        async def read(self, key: str):
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnlyStorage()
+
+def _local_file(tmp_path, content: bytes, name: str = "upload.bin") -> str:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+def _content_key(file_type: str, content: bytes, extension: str) -> str:
+    return f"{file_type}/{media_service.content_filename(hashlib.sha256(content).hexdigest(), extension)}"
+
+def test_s3_save_stat_and_read(s3, tmp_path):
+    content = b"%PDF-1.4 stored document"
+    local_path = _local_file(tmp_path, content)
+    key = _content_key("document", content, "pdf")
+
+    asyncio.run(s3.save(local_path, key, "application/pdf"))
+
+    assert not os.path.exists(local_path)
+    stored = asyncio.run(s3.stat(key))
+    assert stored.size == len(content)
+    assert stored.sha256 == hashlib.sha256(content).hexdigest()
+    assert asyncio.run(s3.read(key)) == content
+    head = s3.client.head_object(Bucket=BUCKET, Key=key)
+    assert head["ContentType"] == "application/pdf"
+    assert "immutable" in head["CacheControl"]
+
+def test_s3_stat_of_missing_object_is_none(s3):
+    assert asyncio.run(s3.stat("document/missing.pdf")) is None
+    assert asyncio.run(s3.read("document/missing.pdf")) is None
+
+def test_s3_stat_ignores_composite_checksums(s3, monkeypatch):
+    head = {"ContentLength": 3, "LastModified": None, "ChecksumSHA256": "c29tZQ==-3"}
+    monkeypatch.setattr(s3.client, "head_object", lambda **kwargs: head)
+
+    assert asyncio.run(s3.stat("document/multipart.pdf")).sha256 is None
+
+def test_s3_list_skips_hidden_objects_and_subdirectories(s3):
+    for key in ("image/a.png", "image/.b.png", "image/derived/c/640.webp", "imagery/d.png"):
+        s3.client.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+
+    listed = asyncio.run(s3.list("image"))
+
+    assert [item.key for item in listed] == ["image/a.png"]
+    assert listed[0].size == 1
+    s3.client.delete_object(Bucket=BUCKET, Key="imagery/d.png")
+
+def test_s3_delete_prefix_leaves_sibling_prefixes(s3):
+    for key in ("image/.partial/u1/0", "image/.partial/u1/1", "image/.partial/u10/0"):
+        s3.client.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+
+    asyncio.run(s3.delete_prefix("image/.partial/u1"))
+
+    remaining = s3.client.list_objects_v2(Bucket=BUCKET, Prefix="image/.partial/")
+    assert [item["Key"] for item in remaining["Contents"]] == ["image/.partial/u10/0"]
+
+def test_s3_presigned_upload_signs_size_and_checksum(s3):
+    content = b"%PDF-1.4 direct upload"
+    sha256 = hashlib.sha256(content).hexdigest()
+    key = _content_key("document", content, "pdf")
+
+    upload = asyncio.run(s3.presigned_upload(key, len(content), sha256, "application/pdf"))
+
+    assert upload["method"] == "PUT"
+    assert upload["headers"]["x-amz-checksum-sha256"] == base64.b64encode(bytes.fromhex(sha256)).decode()
+    signed_headers = httpx.URL(upload["url"]).params["X-Amz-SignedHeaders"].split(";")
+    assert {"content-length", "x-amz-checksum-sha256", "content-type"} <= set(signed_headers)
+
+    response = httpx.put(upload["url"], content=content, headers=upload["headers"])
+    assert response.status_code == 200
+    assert asyncio.run(s3.read(key)) == content
+
+def _complete_direct_upload(file_type: str, extension: str, sha256: str):
+    return asyncio.run(media_library_service.complete_direct_upload(None, file_type, extension, sha256, None))
+
+@pytest.fixture
+def direct_uploads(s3, monkeypatch):
+    """complete_direct_upload against the moto bucket, with nothing indexed yet"""
+    async def find_by_hash(db, file_type, sha256):
+        return None
+
+    monkeypatch.setattr(media_library_service, "storage", s3)
+    monkeypatch.setattr(media_library_service, "find_by_hash", find_by_hash)
+    return s3
+
+def test_direct_upload_with_wrong_content_is_discarded(direct_uploads):
+    # Stores may accept the body as is, the checksum is verified again on completion
+    expected = b"%PDF-1.4 announced content"
+    key = _content_key("document", expected, "pdf")
+    direct_uploads.client.put_object(Bucket=BUCKET, Key=key, Body=b"%PDF-1.4 something else")
+
+    with pytest.raises(HTTPException) as excinfo:
+        _complete_direct_upload("document", "pdf", hashlib.sha256(expected).hexdigest())
+
+    assert excinfo.value.status_code == 400
+    assert "Checksum mismatch" in excinfo.value.detail
+    assert asyncio.run(direct_uploads.stat(key)) is None
+
+def test_direct_upload_over_the_size_limit_is_discarded(direct_uploads, monkeypatch):
+    content = b"%PDF-1.4 " + b"x" * 64
+    key = _content_key("document", content, "pdf")
+    direct_uploads.client.put_object(Bucket=BUCKET, Key=key, Body=content, ChecksumAlgorithm="SHA256")
+    monkeypatch.setattr(media_service, "get_max_size", lambda file_type: 16)
+
+    with pytest.raises(HTTPException) as excinfo:
+        _complete_direct_upload("document", "pdf", hashlib.sha256(content).hexdigest())
+
+    assert excinfo.value.detail == media_service.file_too_large("document", 16).detail
+    assert asyncio.run(direct_uploads.stat(key)) is None
+
+def test_local_save_writes_gzip_sibling(tmp_path):
+    backend = LocalStorage(str(tmp_path / "uploads"), "http://testserver/uploads")
+    content = b'{"key": "value"}\n' * 200_000
+    local_path = _local_file(tmp_path, content)
+
+    asyncio.run(backend.save(local_path, "document/data.json"))
+
+    stored_path = backend.path("document/data.json")
+    with open(f"{stored_path}.gz", "rb") as f:
+        assert gzip.decompress(f.read()) == content
+    assert not [name for name in os.listdir(os.path.dirname(stored_path)) if name.startswith(".")]
+
+def test_precompress_skips_files_over_the_size_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "PRECOMPRESS_MAX_SIZE", 1024)
+    path = _local_file(tmp_path, b"a" * 2048, "large.txt")
+
+    assert precompress(path) == []
+    assert not os.path.exists(f"{path}.gz")
+
+def test_precompress_skips_incompressible_content(tmp_path):
+    path = _local_file(tmp_path, os.urandom(64 * 1024), "random.txt")
+
+    assert precompress(path) == []
+    assert os.listdir(tmp_path) == ["random.txt"]
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services import translation_service
+from fake_openai import FakeOpenAI
+
+LOCALE = "fr"
+
+def _translate_request(body: dict) -> str:
+    """Completion for a translate_segments request: every segment prefixed with the locale"""
+    segments = json.loads(body["messages"][-1]["content"])
+    return json.dumps({key: f"[{LOCALE}] {text}" for key, text in segments.items()})
+
+def _segments(request: dict) -> list:
+    return list(json.loads(request["messages"][-1]["content"]).values())
+
+class FakeSession:
+    async def commit(self):
+        pass
+
+@pytest.fixture
+def memory(monkeypatch):
+    """Translation memory kept in a dict instead of the translation_memory table"""
+    stored = {}
+
+    async def lookup(db, texts, target_locale, model):
+        return {text: stored[(text, target_locale, model)] for text in texts if (text, target_locale, model) in stored}
+
+    async def remember(db, translations, target_locale, model):
+        for text, translated in translations.items():
+            stored.setdefault((text, target_locale, model), translated)
+
+    monkeypatch.setattr(translation_service, "_lookup", lookup)
+    monkeypatch.setattr(translation_service, "_remember", remember)
+    return stored
+
+def _translate(content: dict, fake: FakeOpenAI) -> dict:
+    return asyncio.run(translation_service.translate_content(FakeSession(), content, LOCALE, fake.client()))
+
+CONTENT = {
+    "title": "Welcome",
+    "features": [
+        {"icon": "rocket", "title": "Fast", "description": "Welcome"},
+        {"icon": "shield", "title": "Safe", "description": "  "},
+    ],
+    "tags": ["one", "two"],
+    "count": 3,
+    "draft": False,
+    "subtitle": None,
+}
+
+def test_iter_leaves_skips_identifiers_blank_strings_and_other_values():
+    leaves = list(translation_service._iter_leaves(CONTENT))
+
+    assert leaves == [
+        (("title",), "Welcome"),
+        (("features", 0, "title"), "Fast"),
+        (("features", 0, "description"), "Welcome"),
+        (("features", 1, "title"), "Safe"),
+        (("tags", 0), "one"),
+        (("tags", 1), "two"),
+    ]
+
+def test_translation_rebuilds_the_content_around_translated_leaves(memory):
+    fake = FakeOpenAI(("completion", _translate_request))
+
+    translated = _translate(CONTENT, fake)
+
+    assert translated == {
+        "title": "[fr] Welcome",
+        "features": [
+            {"icon": "rocket", "title": "[fr] Fast", "description": "[fr] Welcome"},
+            {"icon": "shield", "title": "[fr] Safe", "description": "  "},
+        ],
+        "tags": ["[fr] one", "[fr] two"],
+        "count": 3,
+        "draft": False,
+        "subtitle": None,
+    }
+    assert CONTENT["title"] == "Welcome"
+    # Repeated strings are sent once
+    assert len(fake.requests) == 1
+    assert _segments(fake.requests[0]) == ["Welcome", "Fast", "Safe", "one", "two"]
+
+def test_retranslation_only_sends_changed_segments(memory):
+    _translate(CONTENT, FakeOpenAI(("completion", _translate_request)))
+    changed = {**CONTENT, "tags": ["one", "three"]}
+    fake = FakeOpenAI(("completion", _translate_request))
+
+    translated = _translate(changed, fake)
+
+    assert [_segments(request) for request in fake.requests] == [["three"]]
+    assert translated["tags"] == ["[fr] one", "[fr] three"]
+    assert translated["features"][0]["title"] == "[fr] Fast"
+
+def test_unchanged_content_is_translated_from_memory_alone(memory):
+    _translate(CONTENT, FakeOpenAI(("completion", _translate_request)))
+    fake = FakeOpenAI()
+
+    translated = _translate(CONTENT, fake)
+
+    assert fake.requests == []
+    assert translated["title"] == "[fr] Welcome"
+
+def test_new_segments_are_sent_in_batches(memory, monkeypatch):
+    monkeypatch.setattr(translation_service, "SEGMENTS_PER_REQUEST", 3)
+    content = {"items": [f"item {index}" for index in range(7)]}
+    fake = FakeOpenAI(*[("completion", _translate_request)] * 3)
+
+    translated = _translate(content, fake)
+
+    assert [len(_segments(request)) for request in fake.requests] == [3, 3, 1]
+    assert translated["items"] == [f"[fr] item {index}" for index in range(7)]
+    assert len(memory) == 7